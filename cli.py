@@ -2,85 +2,328 @@ import argparse
 import asyncio
 import os
 import json # Import json
+import socket
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from core.batch_scheduler import ORDERINGS, BatchScheduler, parse_priority
 from core.classifier import DocumentClassifier
-from utils.text_processing import preprocess_text
+from core.document import Document
+from models.openrouter_client import DEFAULT_ROLE
+from storage.classification_cache import ClassificationCache
+from storage.file_saver import FileSaver
+from storage.job_queue import JobQueue
+from utils.file_scanner import FileScanner, parse_size
+from utils.text_processing import (
+    JSONStreamError, preprocess_text, iter_json_documents, is_json_collection, read_text_prefix
+)
 
-def classify_single_file(file_path: str, role: Optional[str] = None) -> Dict:
-    """Classify a single document from a file path."""
+def _text_file_document(path_obj: Path) -> Document:
+    """Build a document from a bounded prefix of a text file.
+
+    Only the characters needed for the classification prompt are held in memory;
+    relationship extraction scans the full file from disk via content_path.
+    """
+    content, truncated = read_text_prefix(str(path_obj))
+    if not truncated:
+        return Document(content, str(path_obj.parent), path_obj.name, file_path=str(path_obj))
+    return Document(
+        content, str(path_obj.parent), path_obj.name, file_path=str(path_obj),
+        content_truncated=True, content_path=str(path_obj), content_size=path_obj.stat().st_size
+    )
+
+def _classify(classifier: DocumentClassifier, document: Document, role: Optional[str], all_roles: bool) -> Dict:
+    """Classify a document for one role or all roles, then release its content"""
     try:
-        path_obj = Path(file_path)
-        original_filename = path_obj.name
-        
-        # Determine if the file is a JSON and load content accordingly
-        if path_obj.suffix.lower() == '.json':
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_file_content = json.load(f)
-            content_for_classification = original_file_content.get("content", "")
-            source_for_classification = original_file_content.get("source", str(path_obj.parent))
-        else:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content_for_classification = f.read()
-            original_file_content = {"content": content_for_classification} # Store raw content as a dict
-            source_for_classification = str(path_obj.parent)
-
-        document = {
-            "content": content_for_classification,
-            "source": source_for_classification,
-            "filename": original_filename,
-            "original_document_content": original_file_content # Pass the original content (parsed JSON or raw text in dict)
-        }
-        
-        classifier = DocumentClassifier()
-        result = asyncio.run(classifier.classify_document(document, role))
-        return result
+        if all_roles:
+            return asyncio.run(classifier.classify_document_all_roles(document))
+        return asyncio.run(classifier.classify_document(document, role))
+    finally:
+        document.release()
+
+def load_file_document(file_path: str) -> Document:
+    """Build the document for a file; JSON files supply their own content and source."""
+    path_obj = Path(file_path)
+    if path_obj.suffix.lower() != '.json':
+        return _text_file_document(path_obj)
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            original_file_content = json.load(f)
+    except json.JSONDecodeError:
+        print(f"Error: Invalid JSON format in {file_path}. Attempting to classify as plain text.")
+        return _text_file_document(path_obj)
+    return Document(
+        original_file_content.get("content", ""),
+        original_file_content.get("source", str(path_obj.parent)),
+        path_obj.name,
+        file_path=str(path_obj),
+        original=original_file_content # Saved with the result; shares the content string
+    )
+
+def classify_single_file(file_path: str, role: Optional[str] = None, deadline: Optional[float] = None,
+                         all_roles: bool = False, classifier: Optional[DocumentClassifier] = None) -> Dict:
+    """Classify a single document from a file path.
+
+    With all_roles, every role is classified in one request and the result maps role names to results.
+    Pass a classifier to share it (and its routing stats) across files.
+    """
+    try:
+        document = load_file_document(file_path)
+        classifier = classifier or DocumentClassifier(deadline_seconds=deadline)
+        return _classify(classifier, document, role, all_roles)
     except FileNotFoundError:
         print(f"Error: File not found at {file_path}")
         return {}
-    except json.JSONDecodeError:
-        print(f"Error: Invalid JSON format in {file_path}. Attempting to classify as plain text.")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content_for_classification = f.read()
-        original_file_content = {"content": content_for_classification}
-        path_obj = Path(file_path)
-        original_filename = path_obj.name
-        source_for_classification = str(path_obj.parent)
-        document = {
-            "content": content_for_classification,
-            "source": source_for_classification,
-            "filename": original_filename,
-            "original_document_content": original_file_content
-        }
-        classifier = DocumentClassifier()
-        result = asyncio.run(classifier.classify_document(document, role))
-        return result
     except Exception as e:
         print(f"Error classifying file {file_path}: {e}")
         return {}
 
-def classify_batch_directory(directory_path: str, role: Optional[str] = None, recursive: bool = False) -> Dict[str, Dict]:
-    """Classify all documents in a given directory."""
-    results = {}
-    for root, dirs, files in os.walk(directory_path):
-        if not recursive and root != directory_path:
-            # If not recursive, only process the top-level directory
-            del dirs[:] # Don't recurse into subdirectories
-        for file_name in files:
-            file_path = Path(root) / file_name
-            if file_path.is_file() and not file_name.startswith('.'): # Skip hidden files
-                print(f"Classifying {file_path}...")
-                # classify_single_file already handles extracting filename and source from file_path
-                result = classify_single_file(str(file_path), role)
-                results[str(file_path)] = result
+def classify_json_stream(file_path: str, role: Optional[str] = None, start_offset: int = 0,
+                         deadline: Optional[float] = None, all_roles: bool = False,
+                         requeue_degraded: bool = True,
+                         classifier: Optional[DocumentClassifier] = None) -> Tuple[int, bool, Optional[int]]:
+    """Classify every record of a JSON array or JSONL file, one record at a time.
+
+    Records are streamed from disk, so memory use stays flat regardless of file size.
+    A record that fails to parse or classify is reported and skipped; only errors
+    reading the file itself, or a missing or doubled comma in an array, stop the
+    stream. Returns the offset to resume from (one past the last record processed,
+    or past the broken part of an array), whether the stream reached the end of the file, and the
+    offset of the first record with a degraded result (None if there was none).
+
+    With requeue_degraded, the file is put back on the job queue to be re-run from
+    that first degraded record.
+    """
+    path_obj = Path(file_path)
+    classifier = classifier or DocumentClassifier(deadline_seconds=deadline)
+    # Records have no file of their own; degraded ones are re-run as part of the collection below
+    classifier_requeues = classifier.requeue_degraded
+    classifier.requeue_degraded = False
+    next_offset = start_offset
+    first_degraded = None
+    degraded_roles = set()
+
+    async def run() -> None:
+        nonlocal next_offset, first_degraded
+        for offset, validated in iter_json_documents(file_path, start_offset):
+            print(f"Classifying record {offset} of {file_path}...")
+            document = None
+            try:
+                document = Document.from_dict({
+                    **validated,
+                    "filename": f"{path_obj.stem}_{offset}",
+                    "original_document_content": validated
+                })
+                del validated
+                if all_roles:
+                    results = await classifier.classify_document_all_roles(document)
+                    for role_name, role_result in results.items():
+                        print(f"  Classification ({role_name}): {role_result.get('classification', 'N/A')}")
+                else:
+                    result = await classifier.classify_document(document, role)
+                    print(f"  Classification: {result.get('classification', 'N/A')}")
+                    results = {role or DEFAULT_ROLE: result}
+                for role_name, role_result in results.items():
+                    if role_result.get("degraded"):
+                        degraded_roles.add(None if role_name == DEFAULT_ROLE else role_name)
+                        if first_degraded is None:
+                            first_degraded = offset
+            except Exception as e:
+                print(f"  Error classifying record {offset} of {file_path}: {e!r}; skipping it")
+            finally:
+                if document is not None:
+                    document.release()
+            next_offset = offset + 1
+
+    finished = True
+    try:
+        asyncio.run(run())
+    except (Exception, KeyboardInterrupt) as e:
+        if isinstance(e, JSONStreamError):
+            # A broken array: resuming from the record after the error gets past it
+            next_offset = max(next_offset, e.resume_offset)
+        print(f"Error streaming {file_path}: {e!r}")
+        print(f"Resume with: --file {file_path} --start-offset {next_offset}")
+        finished = False
+    classifier.requeue_degraded = classifier_requeues
+    if first_degraded is not None and requeue_degraded:
+        queue = JobQueue()
+        for degraded_role in degraded_roles:
+            queue.requeue([str(path_obj.resolve())], degraded_role, first_degraded)
+        print(f"Degraded results from record {first_degraded} of {file_path}; queued for re-run from there")
+    return next_offset, finished, first_degraded
+
+def iter_directory_files(directory_path: str, recursive: bool = False, scanner: Optional[FileScanner] = None):
+    """Yield the classifiable files of a directory as they are found, optionally recursing into subdirectories.
+
+    Hidden files, binaries, .gitignore'd paths and directories such as node_modules are skipped.
+    """
+    scanner = scanner or FileScanner()
+    for file_path in scanner.scan(directory_path, recursive):
+        yield Path(file_path)
+
+def classify_batch_directory(directory_path: str, role: Optional[str] = None, recursive: bool = False,
+                             deadline: Optional[float] = None, all_roles: bool = False,
+                             scanner: Optional[FileScanner] = None, order: str = "walk",
+                             priorities: Optional[List[Tuple[str, int]]] = None, concurrency: Optional[int] = None,
+                             progress_file: Optional[str] = None) -> Dict[str, Dict]:
+    """Classify all documents in a given directory, each within an optional time budget in seconds.
+
+    Files are classified concurrently by a BatchScheduler in the given order (see
+    core.batch_scheduler.ORDERINGS); JSON collections are streamed afterwards.
+    """
+    collections = []
+
+    def single_documents():
+        for file_path in iter_directory_files(directory_path, recursive, scanner):
+            if is_json_collection(str(file_path)):
+                collections.append(str(file_path))
+            else:
+                yield str(file_path)
+
+    classifier = DocumentClassifier(deadline_seconds=deadline)
+    scheduler = BatchScheduler(
+        classifier,
+        load_file_document,
+        order=order,
+        priorities=priorities,
+        concurrency=concurrency,
+        role=role,
+        all_roles=all_roles,
+        deadline=deadline,
+        progress_file=progress_file
+    )
+    results = asyncio.run(scheduler.run(single_documents()))
+    for file_path in collections:
+        # Multi-record files are streamed; per-record results are printed as they complete
+        processed, _, _ = classify_json_stream(
+            file_path, role, deadline=deadline, all_roles=all_roles, classifier=classifier
+        )
+        results[file_path] = {"records_processed": processed}
+    print_routing_stats(classifier)
     return results
 
+def enqueue_documents(paths, role: Optional[str] = None, recursive: bool = False,
+                      scanner: Optional[FileScanner] = None) -> int:
+    """Add files, or the files of directories, to the shared job queue."""
+    def documents():
+        for path in paths:
+            if Path(path).is_dir():
+                for file_path in iter_directory_files(path, recursive, scanner):
+                    yield str(file_path.resolve())
+            else:
+                yield str(Path(path).resolve())
+    return JobQueue().enqueue(documents(), role)
+
+def run_queue_worker(worker_id: Optional[str] = None, max_jobs: Optional[int] = None,
+                     wait: bool = False, poll_interval: float = 5.0, deadline: Optional[float] = None) -> int:
+    """Lease and classify jobs from the shared queue until it is drained.
+
+    Leases are extended by a heartbeat thread while a document is being classified,
+    so a crashed worker's job is picked up by another worker once its lease expires.
+    Returns the number of jobs completed.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = JobQueue()
+    classifier = DocumentClassifier(deadline_seconds=deadline)
+    completed = 0
+    while max_jobs is None or completed < max_jobs:
+        jobs = queue.lease(worker_id)
+        if not jobs:
+            if not wait:
+                break
+            time.sleep(poll_interval)
+            continue
+        job = jobs[0]
+        print(f"[{worker_id}] Classifying {job['document']} (attempt {job['attempts']})...")
+        error = None
+        resume_offset = None
+        try:
+            with queue.keep_alive(worker_id, [job["id"]]):
+                if is_json_collection(job["document"]):
+                    next_offset, finished, first_degraded = classify_json_stream(
+                        job["document"], job["role"], job["resume_offset"], deadline=deadline,
+                        requeue_degraded=False, classifier=classifier
+                    )
+                    if not finished:
+                        # The next attempt continues from the first record not yet processed
+                        error = f"stream stopped at record {next_offset}"
+                        resume_offset = next_offset if first_degraded is None else first_degraded
+                    elif first_degraded is not None:
+                        error = "degraded result: deadline exceeded"
+                        resume_offset = first_degraded
+                else:
+                    result = classify_single_file(job["document"], job["role"], deadline, classifier=classifier)
+                    if not result:
+                        error = "classification returned no result"
+                    elif result.get("degraded"):
+                        # Retried by the queue until a full classification fits in the budget
+                        error = "degraded result: deadline exceeded"
+        except Exception as e:
+            error = repr(e)
+        if error is None:
+            if queue.complete(job, worker_id):
+                completed += 1
+            else:
+                print(f"[{worker_id}] Lease on {job['document']} was lost before completion")
+        else:
+            queue.fail(job, worker_id, error, resume_offset)
+            print(f"[{worker_id}] Failed {job['document']}: {error}")
+    print_routing_stats(classifier)
+    return completed
+
+def print_routing_stats(classifier: DocumentClassifier) -> None:
+    """Print per-tier call counts, latency, tokens and cost, for tuning config/model_routing.yaml"""
+    stats = {tier: tier_stats for tier, tier_stats in classifier.routing_stats().items() if tier_stats["calls"]}
+    if not stats:
+        return
+    print("--- Model Routing ---")
+    for tier, tier_stats in stats.items():
+        print(
+            f"{tier}: {tier_stats['calls']} call(s), avg latency {tier_stats['avg_latency_seconds']:.2f}s"
+            f" (max {tier_stats['max_latency_seconds']:.2f}s), {tier_stats['prompt_tokens']} prompt"
+            f" + {tier_stats['completion_tokens']} completion tokens, ${tier_stats['cost_usd']:.4f},"
+            f" {tier_stats['low_confidence']} low-confidence"
+        )
+
+def print_queue_status(show_failed: bool = False) -> None:
+    queue = JobQueue()
+    counts = queue.status()
+    print("--- Job Queue Status ---")
+    for status, count in counts.items():
+        print(f"{status}: {count}")
+    if show_failed:
+        for job in queue.failed_jobs():
+            print(f"FAILED {job['document']} (attempts: {job['attempts']}): {job['last_error']}")
+
+def add_scan_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the directory scanning filters to a parser"""
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB",
+                        help="Only classify files matching this glob (repeatable).")
+    parser.add_argument("--exclude", action="append", default=None, metavar="GLOB",
+                        help="Skip files and directories matching this glob (repeatable).")
+    parser.add_argument("--extensions", type=str, default=None,
+                        help="Comma-separated list of allowed file extensions (e.g. 'md,txt,json').")
+    parser.add_argument("--max-size", type=parse_size, default=None,
+                        help="Skip files larger than this size (bytes, or with a K/M/G suffix).")
+    parser.add_argument("--scan-workers", type=int, default=int(os.getenv("SCAN_WORKERS", "8")),
+                        help="Threads used to scan directory trees in parallel.")
+
+def scanner_from_args(args: argparse.Namespace) -> FileScanner:
+    return FileScanner(
+        include=args.include,
+        exclude=args.exclude,
+        extensions=args.extensions.split(",") if args.extensions else None,
+        max_size=args.max_size,
+        workers=args.scan_workers
+    )
+
 def main():
     load_dotenv() # Load environment variables from .env file
     parser = argparse.ArgumentParser(description="RAG Classification CLI Tool")
-    group = parser.add_mutually_exclusive_group(required=True)
+    group = parser.add_mutually_exclusive_group()
     group.add_argument(
         "--file",
         type=str,
@@ -102,31 +345,162 @@ def main():
         default=None,
         help="Optional role for classification (e.g., 'legal', 'medical')."
     )
+    parser.add_argument(
+        "--all-roles",
+        action="store_true",
+        help="Classify for every role (default, CODE, ARCHITECT) in a single request per document."
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Time budget in seconds per document; degraded rule-based results are returned when it runs out."
+    )
+    parser.add_argument(
+        "--start-offset",
+        type=int,
+        default=0,
+        help="Record offset to resume from when streaming a JSON array or JSONL file."
+    )
+    add_scan_arguments(parser)
+    parser.add_argument(
+        "--order",
+        choices=ORDERINGS,
+        default="walk",
+        help="Batch order for --directory: as discovered, largest files first, cached documents first, or by --priority."
+    )
+    parser.add_argument(
+        "--priority",
+        type=parse_priority,
+        action="append",
+        default=None,
+        metavar="GLOB=N",
+        help="Priority for files matching GLOB with --order priority; higher runs first (repeatable)."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Documents classified at once in --directory mode (default: BATCH_CONCURRENCY or 4)."
+    )
+    parser.add_argument(
+        "--progress-file",
+        type=str,
+        default=None,
+        help="JSON file kept up to date with batch progress (counts, throughput, cache hit rate, ETA)."
+    )
+
+    subparsers = parser.add_subparsers(dest="command", title="job queue commands")
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add files or directories to the shared job queue.")
+    enqueue_parser.add_argument("paths", nargs="+", help="Files or directories to enqueue.")
+    enqueue_parser.add_argument("--recursive", action="store_true", help="Enqueue directories recursively.")
+    enqueue_parser.add_argument("--role", type=str, default=None, help="Optional role for classification.")
+    add_scan_arguments(enqueue_parser)
+    work_parser = subparsers.add_parser("work", help="Classify documents leased from the shared job queue.")
+    work_parser.add_argument("--worker-id", type=str, default=None, help="Worker name (default: host-pid).")
+    work_parser.add_argument("--max-jobs", type=int, default=None, help="Stop after this many completed jobs.")
+    work_parser.add_argument("--deadline", type=float, default=None, help="Time budget in seconds per document.")
+    work_parser.add_argument("--wait", action="store_true", help="Keep polling for new jobs instead of exiting when the queue is empty.")
+    status_parser = subparsers.add_parser("status", help="Show job queue counts by status.")
+    status_parser.add_argument("--failed", action="store_true", help="List failed jobs with their last error.")
+
+    cache_parser = subparsers.add_parser("cache", help="Export or import classification cache snapshots.")
+    cache_subparsers = cache_parser.add_subparsers(dest="cache_command", required=True)
+    export_parser = cache_subparsers.add_parser("export", help="Write unexpired cache entries to a compressed snapshot.")
+    export_parser.add_argument("path", help="Snapshot file to write (gzip-compressed JSONL).")
+    export_parser.add_argument("--taxonomy-version", type=str, default=None, help="Only export entries for this taxonomy version.")
+    import_parser = cache_subparsers.add_parser("import", help="Merge a snapshot into the local cache.")
+    import_parser.add_argument("path", help="Snapshot file to read.")
+    import_parser.add_argument("--taxonomy-version", type=str, default=None, help="Only import entries for this taxonomy version.")
+
+    replay_parser = subparsers.add_parser("replay", help="Re-derive results and outputs from recorded LLM responses, without API calls.")
+    replay_parser.add_argument("--simulate-latency", action="store_true", help="Wait for each response's recorded latency (for performance tests).")
+
+    columnar_parser = subparsers.add_parser("export-columnar", help="Append new results and relationships to a columnar dataset.")
+    columnar_parser.add_argument("output_dir", help="Dataset directory; repeated exports append only what is new.")
+    columnar_parser.add_argument("--source", choices=("cache", "outputs"), default="cache", help="Read the classification cache or the saved JSON outputs.")
+    columnar_parser.add_argument("--backend", choices=("parquet", "numpy"), default=None, help="Parquet (needs pyarrow) or .npz (needs numpy); defaults to whichever is installed.")
+
+    compact_parser = subparsers.add_parser("compact", help="Remove superseded outputs, keeping the newest per document and role.")
+    compact_parser.add_argument("--dry-run", action="store_true", help="List the outputs that would be removed without deleting them.")
 
     args = parser.parse_args()
 
+    if args.command == "enqueue":
+        added = enqueue_documents(args.paths, args.role, args.recursive, scanner_from_args(args))
+        print(f"Enqueued {added} new document(s).")
+        return
+    if args.command == "work":
+        completed = run_queue_worker(args.worker_id, args.max_jobs, args.wait, deadline=args.deadline)
+        print(f"Worker finished after completing {completed} job(s).")
+        return
+    if args.command == "status":
+        print_queue_status(args.failed)
+        return
+    if args.command == "cache":
+        cache = ClassificationCache()
+        if args.cache_command == "export":
+            exported = cache.export_snapshot(args.path, args.taxonomy_version)
+            print(f"Exported {exported} cache entries to {args.path}")
+        else:
+            read, merged = cache.import_snapshot(args.path, args.taxonomy_version)
+            print(f"Read {read} snapshot entries, merged {merged} into the cache")
+        return
+    if args.command == "replay":
+        classifier = DocumentClassifier(replay=True, simulate_latency=args.simulate_latency)
+        replayed = asyncio.run(classifier.replay())
+        print(f"Replayed {replayed} recorded response(s).")
+        return
+    if args.command == "export-columnar":
+        from storage.columnar_export import ColumnarExporter
+        classified, edges = ColumnarExporter(args.output_dir, args.backend).export(args.source)
+        print(f"Appended {classified} classification(s) and {edges} relationship edge(s) to {args.output_dir}")
+        return
+    if args.command == "compact":
+        kept, removed = FileSaver().compact(args.dry_run)
+        print(f"{'Would remove' if args.dry_run else 'Removed'} {removed} superseded output(s); kept {kept}.")
+        return
+    if not (args.file or args.directory):
+        parser.error("one of the arguments --file --directory or a command (enqueue, work, status, cache, replay, export-columnar, compact) is required")
+
     if args.file:
         file_path = Path(args.file)
         if not file_path.is_file():
             print(f"Error: {args.file} is not a valid file. Please provide a valid file path.")
             return
+        if is_json_collection(args.file):
+            print(f"Streaming records from: {args.file} (starting at offset {args.start_offset})")
+            next_offset, _, _ = classify_json_stream(args.file, args.role, args.start_offset, args.deadline, args.all_roles)
+            print(f"\nProcessed records up to offset {next_offset}")
+            return
         print(f"Classifying single file: {args.file}")
-        result = classify_single_file(args.file, args.role)
+        result = classify_single_file(args.file, args.role, args.deadline, args.all_roles)
         print("\n--- Single File Classification Result ---")
-        print(f"Classification: {result.get('classification', 'N/A')}")
-        print(f"Relationships: {result.get('relationships', 'N/A')}")
+        for role_name, role_result in (result.items() if args.all_roles else [(None, result)]):
+            if role_name:
+                print(f"Role: {role_name}")
+            print(f"Classification: {role_result.get('classification', 'N/A')}")
+            print(f"Relationships: {role_result.get('relationships', 'N/A')}")
     elif args.directory:
         directory_path = Path(args.directory)
         if not directory_path.is_dir():
             print(f"Error: {args.directory} is not a valid directory. Please provide a valid directory path.")
             return
         print(f"Starting batch classification for directory: {args.directory} (Recursive: {args.recursive})")
-        results = classify_batch_directory(args.directory, args.role, args.recursive)
+        results = classify_batch_directory(
+            args.directory, args.role, args.recursive, args.deadline, args.all_roles, scanner_from_args(args),
+            args.order, args.priority, args.concurrency, args.progress_file
+        )
         print("\n--- Batch Classification Results ---")
         for file_path, result in results.items():
             print(f"File: {file_path}")
-            print(f"  Classification: {result.get('classification', 'N/A')}")
-            print(f"  Relationships: {result.get('relationships', 'N/A')}")
+            if args.all_roles and "records_processed" not in result:
+                for role_name, role_result in result.items():
+                    print(f"  Classification ({role_name}): {role_result.get('classification', 'N/A')}")
+                print(f"  Relationships: {next(iter(result.values()), {}).get('relationships', 'N/A')}")
+            else:
+                print(f"  Classification: {result.get('classification', 'N/A')}")
+                print(f"  Relationships: {result.get('relationships', 'N/A')}")
             print("-" * 30)
 
 if __name__ == "__main__":
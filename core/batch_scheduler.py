@@ -0,0 +1,394 @@
+import asyncio
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from core.classifier import DocumentClassifier
+from core.document import Document
+
+ORDERINGS = ("walk", "largest", "cache-first", "priority")
+# Without a terminal the progress line is logged as a new line this often instead of redrawn
+LOG_PROGRESS_SECONDS = 30.0
+
+def parse_priority(value: str) -> Tuple[str, int]:
+    """Parse a GLOB=PRIORITY option, e.g. 'docs/api/*=10'"""
+    glob, separator, priority = value.rpartition("=")
+    if not separator or not glob:
+        raise ValueError(f"Expected GLOB=PRIORITY, got '{value}'")
+    return glob, int(priority)
+
+class BatchProgress:
+    """Counters for a batch run, rendered as a progress line and a JSON progress file."""
+
+    def __init__(self, classifier: DocumentClassifier):
+        self.classifier = classifier
+        self.started = time.monotonic()
+        self.started_at = datetime.now().isoformat()
+        self.total = 0
+        self.total_bytes = 0
+        self.discovery_done = False
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.bytes_done = 0
+        self.finished = False
+        self._lookups_at_start = classifier.cache_lookups
+        self._hits_at_start = classifier.cache_hits
+        self._coalesced_at_start = classifier.coalesced_requests
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def throughput(self) -> float:
+        elapsed = self.elapsed()
+        return (self.completed + self.failed) / elapsed if elapsed > 0 else 0.0
+
+    def cache_hit_rate(self) -> Optional[float]:
+        lookups = self.classifier.cache_lookups - self._lookups_at_start
+        return (self.classifier.cache_hits - self._hits_at_start) / lookups if lookups else None
+
+    def coalesced_requests(self) -> int:
+        """Requests that shared another in-flight request's classification instead of calling the LLM"""
+        return self.classifier.coalesced_requests - self._coalesced_at_start
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time, from bytes processed when file sizes are known, otherwise from document count"""
+        if not self.discovery_done:
+            return None
+        elapsed = self.elapsed()
+        if self.total_bytes and self.bytes_done:
+            return (self.total_bytes - self.bytes_done) * elapsed / self.bytes_done
+        processed = self.completed + self.failed
+        return (self.total - processed) * elapsed / processed if processed else None
+
+    def as_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "total_known": self.discovery_done,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "bytes_done": self.bytes_done,
+            "total_bytes": self.total_bytes,
+            "throughput_per_second": round(self.throughput(), 3),
+            "cache_hit_rate": self.cache_hit_rate(),
+            "coalesced_requests": self.coalesced_requests(),
+            "routing": {tier: stats for tier, stats in self.classifier.routing_stats().items() if stats["calls"]},
+            "eta_seconds": self.eta_seconds(),
+            "elapsed_seconds": round(self.elapsed(), 1),
+            "started_at": self.started_at,
+            "updated_at": datetime.now().isoformat(),
+            "finished": self.finished
+        }
+
+    def line(self) -> str:
+        processed = self.completed + self.failed
+        total = f"{self.total}" if self.discovery_done else f"{self.total}+"
+        percent = f" {100.0 * processed / self.total:5.1f}%" if self.discovery_done and self.total else ""
+        hit_rate = self.cache_hit_rate()
+        eta = self.eta_seconds()
+        return (
+            f"[{processed}/{total}{percent}] {self.throughput():.2f} docs/s"
+            f" | in-flight {self.in_flight}"
+            f" | cache hits {'-' if hit_rate is None else f'{100.0 * hit_rate:.0f}%'}"
+            f" | coalesced {self.coalesced_requests()}"
+            f" | failed {self.failed}"
+            f" | ETA {'-' if eta is None else time.strftime('%H:%M:%S', time.gmtime(eta))}"
+        )
+
+class BatchScheduler:
+    """Runs a batch of files through one DocumentClassifier in a chosen order.
+
+    Work is split into a CPU stage (reading and building documents, on a thread
+    pool) and an LLM stage (classification, on the event loop; the classifier
+    runs preprocessing, relationship extraction and saving on worker threads
+    so the event loop only waits on them). A bounded queue
+    between them lets the CPU stage run only a little ahead of the LLM stage, so
+    neither idles and memory stays bounded.
+
+    Orderings:
+        walk         as the paths are discovered; classification starts immediately
+        largest      biggest files first, so a few huge files do not idle the pool at the end
+        cache-first  documents with a cached classification first; these are handed on as
+                     soon as a lookup finds them, so only the misses are read twice
+        priority     by user-supplied GLOB=PRIORITY rules, highest first
+    """
+
+    def __init__(
+        self,
+        classifier: DocumentClassifier,
+        loader: Callable[[str], Document],
+        order: str = "walk",
+        priorities: Optional[Sequence[Tuple[str, int]]] = None,
+        concurrency: Optional[int] = None,
+        cpu_workers: Optional[int] = None,
+        role: Optional[str] = None,
+        all_roles: bool = False,
+        deadline: Optional[float] = None,
+        progress_file: Optional[str] = None,
+        progress_interval: float = 1.0,
+        show_progress: bool = True
+    ):
+        """
+        Args:
+            classifier (DocumentClassifier): Classifier shared by the whole batch.
+            loader (Callable[[str], Document]): Builds the document for a file path; runs on the CPU stage.
+            order (str): One of ORDERINGS.
+            priorities (Optional[Sequence[Tuple[str, int]]]): (glob, priority) rules for the priority order;
+                         a file gets the highest priority of the globs it matches, 0 if none.
+            concurrency (Optional[int]): Documents classified at once (defaults to BATCH_CONCURRENCY, 4).
+            cpu_workers (Optional[int]): Threads for the CPU stage (defaults to BATCH_CPU_WORKERS, 4).
+            role (Optional[str]): Classification role.
+            all_roles (bool): Classify every role in one request per document.
+            deadline (Optional[float]): Time budget in seconds per document.
+            progress_file (Optional[str]): JSON file rewritten with the progress counters every interval.
+            progress_interval (float): Seconds between progress updates.
+            show_progress (bool): Print the progress line to stderr.
+        """
+        if order not in ORDERINGS:
+            raise ValueError(f"Unknown batch order '{order}'; use one of {', '.join(ORDERINGS)}.")
+        self.classifier = classifier
+        self.loader = loader
+        self.order = order
+        self.priorities = list(priorities or [])
+        self.concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+        self.cpu_workers = cpu_workers or int(os.getenv("BATCH_CPU_WORKERS", "4"))
+        self.role = role
+        self.all_roles = all_roles
+        self.deadline = deadline
+        self.progress_file = progress_file
+        self.progress_interval = progress_interval
+        self.show_progress = show_progress
+        self.progress = BatchProgress(classifier)
+        self._last_logged = None
+
+    async def run(self, paths: Iterable[str]) -> Dict[str, Dict]:
+        """Classify all paths and return the result per path ({} for failures)"""
+        loop = asyncio.get_running_loop()
+        results: Dict[str, Dict] = {}
+        prepared: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        with ThreadPoolExecutor(max_workers=self.cpu_workers, thread_name_prefix="batch-cpu") as cpu_pool:
+            reporter = asyncio.create_task(self._report())
+            llm_workers = [asyncio.create_task(self._classify_worker(prepared, results)) for _ in range(self.concurrency)]
+            try:
+                await self._produce(loop, cpu_pool, paths, prepared, results)
+                for _ in llm_workers:
+                    await prepared.put(None)
+                await asyncio.gather(*llm_workers)
+            finally:
+                for worker in llm_workers:
+                    worker.cancel()
+                self.progress.finished = True
+                reporter.cancel()
+                self._write_progress()
+                if self.show_progress:
+                    self._print_progress(final=True)
+        return results
+
+    async def _produce(self, loop, cpu_pool: ThreadPoolExecutor, paths: Iterable[str],
+                       prepared: asyncio.Queue, results: Dict[str, Dict]) -> None:
+        """CPU stage: order the paths, then load documents with at most cpu_workers in progress"""
+        slots = asyncio.Semaphore(self.cpu_workers)
+        loads = set()
+
+        async def load(path: str, size: int, document: Optional[Document]) -> None:
+            # The slot is held until the document is queued, so at most cpu_workers loaded
+            # documents wait on a full queue
+            try:
+                if document is None:
+                    document = await loop.run_in_executor(cpu_pool, self.loader, path)
+                await prepared.put((path, size, document))
+            except Exception as e:
+                print(f"Error loading {path}: {e}")
+                results[path] = {}
+                self.progress.failed += 1
+                self.progress.bytes_done += size
+            finally:
+                slots.release()
+
+        async for path, size, document in self._ordered(loop, cpu_pool, paths):
+            await slots.acquire()
+            task = asyncio.create_task(load(path, size, document))
+            loads.add(task)
+            task.add_done_callback(loads.discard)
+        if loads:
+            await asyncio.gather(*loads)
+
+    async def _ordered(self, loop, cpu_pool: ThreadPoolExecutor, paths: Iterable[str]):
+        """Yield (path, size, document) in the scheduling order, updating the progress totals.
+
+        document is None unless the ordering already had to load it.
+        """
+        progress = self.progress
+        iterator: Iterator[str] = iter(paths)
+        if self.order == "walk":
+            # Pull paths from the (possibly still running) directory walk without blocking the loop
+            while True:
+                path = await loop.run_in_executor(None, next, iterator, None)
+                if path is None:
+                    break
+                progress.total += 1
+                yield str(path), 0, None
+            progress.discovery_done = True
+            return
+
+        entries: List[Tuple[str, int]] = []
+        while True:
+            batch = await loop.run_in_executor(None, self._stat_batch, iterator)
+            if not batch:
+                break
+            entries.extend(batch)
+            progress.total = len(entries)
+        progress.total_bytes = sum(size for _, size in entries)
+
+        if self.order == "largest":
+            entries.sort(key=lambda entry: entry[1], reverse=True)
+        elif self.order == "priority":
+            entries.sort(key=lambda entry: self._priority(entry[0]), reverse=True)
+        elif self.order == "cache-first":
+            progress.discovery_done = True
+            misses: List[Tuple[int, str, int]] = []
+            async for hit in self._cache_hits(loop, cpu_pool, entries, misses):
+                yield hit
+            # Misses follow in discovery order
+            for _, path, size in sorted(misses):
+                yield path, size, None
+            return
+        progress.discovery_done = True
+        for path, size in entries:
+            yield path, size, None
+
+    @staticmethod
+    def _stat_batch(iterator: Iterator[str], batch_size: int = 1000) -> List[Tuple[str, int]]:
+        batch = []
+        for path in iterator:
+            path = str(path)
+            try:
+                size = os.stat(path).st_size
+            except OSError:
+                size = 0
+            batch.append((path, size))
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    def _priority(self, path: str) -> int:
+        name = Path(path).name
+        matched = [priority for glob, priority in self.priorities if fnmatch.fnmatch(path, glob) or fnmatch.fnmatch(name, glob)]
+        return max(matched) if matched else 0
+
+    async def _cache_hits(self, loop, cpu_pool: ThreadPoolExecutor, entries: List[Tuple[str, int]],
+                          misses: List[Tuple[int, str, int]]):
+        """Yield (path, size, document) for every entry with a cached classification, as lookups finish.
+
+        Entries without one are released and added to misses as (index, path, size).
+        At most cpu_workers * 2 lookups run at a time and at most cpu_workers hits wait
+        to be consumed, so neither the tasks nor the loaded documents grow with the tree.
+        """
+        lookups = asyncio.Semaphore(self.cpu_workers * 2)
+        hits: asyncio.Queue = asyncio.Queue(maxsize=self.cpu_workers)
+        tasks = set()
+
+        async def lookup(index: int, path: str, size: int) -> None:
+            # The slot is held until a hit is queued, bounding the documents held by lookups
+            try:
+                try:
+                    document = await loop.run_in_executor(cpu_pool, self.loader, path)
+                except Exception:
+                    misses.append((index, path, size)) # Reported when loaded again for classification
+                    return
+                try:
+                    cached = await self.classifier.is_cached(document, None if self.all_roles else self.role)
+                except Exception:
+                    cached = False
+                if cached:
+                    await hits.put((path, size, document))
+                else:
+                    document.release()
+                    misses.append((index, path, size))
+            finally:
+                lookups.release()
+
+        async def start_lookups() -> None:
+            for index, (path, size) in enumerate(entries):
+                await lookups.acquire()
+                task = asyncio.create_task(lookup(index, path, size))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+            await hits.put(None)
+
+        starter = asyncio.create_task(start_lookups())
+        try:
+            while True:
+                hit = await hits.get()
+                if hit is None:
+                    break
+                yield hit
+            await starter
+        finally:
+            starter.cancel()
+            for task in list(tasks):
+                task.cancel()
+
+    async def _classify_worker(self, prepared: asyncio.Queue, results: Dict[str, Dict]) -> None:
+        """LLM stage: classify prepared documents until the end-of-batch marker"""
+        progress = self.progress
+        while True:
+            item = await prepared.get()
+            if item is None:
+                return
+            path, size, document = item
+            progress.in_flight += 1
+            try:
+                if self.all_roles:
+                    result = await self.classifier.classify_document_all_roles(document, deadline=self.deadline)
+                else:
+                    result = await self.classifier.classify_document(document, self.role, self.deadline)
+            except Exception as e:
+                print(f"Error classifying file {path}: {e}")
+                result = {}
+            finally:
+                document.release()
+                progress.in_flight -= 1
+            results[path] = result
+            progress.bytes_done += size
+            if result:
+                progress.completed += 1
+            else:
+                progress.failed += 1
+
+    async def _report(self) -> None:
+        while True:
+            if self.show_progress:
+                self._print_progress()
+            self._write_progress()
+            await asyncio.sleep(self.progress_interval)
+
+    def _print_progress(self, final: bool = False) -> None:
+        line = self.progress.line()
+        if sys.stderr.isatty():
+            print(f"\r\033[K{line}", end="\n" if final else "", file=sys.stderr, flush=True)
+            return
+        now = time.monotonic()
+        if final or self._last_logged is None or now - self._last_logged >= LOG_PROGRESS_SECONDS:
+            self._last_logged = now
+            print(line, file=sys.stderr, flush=True)
+
+    def _write_progress(self) -> None:
+        """Atomically rewrite the progress file for external orchestrators"""
+        if not self.progress_file:
+            return
+        tmp_path = f"{self.progress_file}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.progress.as_dict(), f)
+            os.replace(tmp_path, self.progress_file)
+        except OSError as e:
+            print(f"Error writing progress file {self.progress_file}: {e}")
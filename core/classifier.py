@@ -1,29 +1,75 @@
-from typing import Dict, Optional
+import asyncio
+import hashlib
+import os
+import time
+from typing import Dict, Iterable, Optional, Union
+from core.deadline import Deadline
+from core.document import Document
+from core.error_handling import DeadlineExceededError, ErrorHandler, ResponseParseError
 from models.llm_client import LLMClient
+from models.openrouter_client import DEFAULT_ROLE, OpenRouterClient
 from storage.classification_cache import ClassificationCache
 from storage.relationship_store import RelationshipStore
+from storage.response_recorder import ResponseRecorder
 from storage.file_saver import FileSaver # Import FileSaver
 from utils.text_processing import preprocess_text
 from pathlib import Path
 import yaml
 
-TAXONOMY = yaml.safe_load((Path(__file__).parent.parent / "config" / "taxonomy.yaml").read_text())
+_TAXONOMY_TEXT = (Path(__file__).parent.parent / "config" / "taxonomy.yaml").read_text()
+TAXONOMY = yaml.safe_load(_TAXONOMY_TEXT)
+# Identifies the taxonomy a cached classification was produced with
+TAXONOMY_VERSION = str(TAXONOMY.get("version") or hashlib.sha256(_TAXONOMY_TEXT.encode("utf-8")).hexdigest()[:12])
+
+# Roles classified by classify_document_all_roles; None is the default role
+ALL_ROLES = (None, "CODE", "ARCHITECT")
 
 class DocumentClassifier:
-    def __init__(self):
-        self.llm_client = LLMClient()
-        self.cache = ClassificationCache()
+    def __init__(self, replay: bool = False, simulate_latency: bool = False, deadline_seconds: Optional[float] = None):
+        """
+        Args:
+            replay (bool): Serve classifications from recorded LLM responses instead of
+                           calling the API (no API key or network needed).
+            simulate_latency (bool): In replay mode, wait for each response's recorded latency.
+            deadline_seconds (Optional[float]): Default time budget per document; when it
+                           runs out a degraded rule-based result is returned instead.
+        """
+        if deadline_seconds is None and os.getenv("CLASSIFY_DEADLINE_SECONDS"):
+            deadline_seconds = float(os.getenv("CLASSIFY_DEADLINE_SECONDS"))
+        self.deadline_seconds = deadline_seconds
+        self.error_handler = ErrorHandler()
+        self._rerun_queue = None
+        # Callers that re-run degraded results themselves (e.g. JSON collection streams) turn this off
+        self.requeue_degraded = True
+        self.replay_mode = replay
+        self.simulate_latency = simulate_latency
+        self.llm_client = None if replay else LLMClient()
+        self.cache = ClassificationCache(taxonomy_version=TAXONOMY_VERSION)
         self.relationship_store = RelationshipStore()
+        self.recorder = ResponseRecorder()
+        self.record_responses = os.getenv("RECORD_LLM_RESPONSES", "true").lower() in ("1", "true", "yes")
         self.file_saver = FileSaver() # Initialize FileSaver
+        # Files under the corpus root are cached by their path relative to it, so keys match across nodes
+        self.corpus_root = Path(os.getenv("CORPUS_ROOT")).resolve() if os.getenv("CORPUS_ROOT") else None
+        # Futures for classifications currently in progress, keyed by cache key
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.coalesced_requests = 0
+        # Cache lookups and hits per classified role, for batch progress reporting
+        self.cache_lookups = 0
+        self.cache_hits = 0
 
-    async def classify_document(self, document: Dict, role: Optional[str] = None) -> Dict:
+    async def classify_document(self, document: Dict, role: Optional[str] = None,
+                                deadline: Union[Deadline, float, None] = None) -> Dict:
         """
         Classify a document with optional role-specific processing and save the result.
 
         Args:
             document (Dict): The document to classify, expected to contain 'content',
                              'source' (original path), and 'filename' (original filename).
+                             A core.document.Document record can be passed instead of a dict.
             role (Optional[str]): The optional role for classification.
+            deadline (Union[Deadline, float, None]): Time budget in seconds, or a Deadline
+                             shared across a batch. Defaults to the classifier's deadline_seconds.
 
         Returns:
             Dict: The classification result.
@@ -33,66 +79,285 @@ class DocumentClassifier:
         original_filename = document.get("filename", "unknown_file")
 
         # Check cache first
-        cache_key = self._generate_cache_key(document)
-        cached_result = self.cache.get(cache_key)
+        cache_key = self._generate_cache_key(document, role)
+        cached_result = await self.cache.aget(cache_key)
+        self.cache_lookups += 1
         if cached_result:
-            # If cached, ensure it has the necessary structure for saving
-            if "classification" in cached_result and "relationships" in cached_result:
-                # Simulate processing time for cached results if needed for metadata
-                cached_result["processing_time_seconds"] = 0.0 # Or retrieve from cache metadata
-                self.file_saver.save_classified_document(
-                    original_document_data=document, # Pass the entire document dict
-                    classification_result=cached_result,
-                    original_filename=original_filename
-                )
-            return cached_result
+            return await self._serve_cached(document, role, cached_result)
+
+        # Coalesce concurrent requests for the same document onto a single LLM call
+        coalesced = False
+        while cache_key in self._in_flight:
+            in_flight = self._in_flight[cache_key]
+            if not coalesced:
+                self.coalesced_requests += 1
+                coalesced = True
+            try:
+                result = await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise # This request itself was cancelled
+                # The request doing the classification was cancelled; take over or join its successor
+                continue
+            await self._save(document, result, role)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[cache_key] = future
+        try:
+            result = await self._classify_uncached(document, role, cache_key, deadline)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # Mark as retrieved in case no duplicate is waiting
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._in_flight[cache_key]
+        return result
+
+    async def _serve_cached(self, document: Dict, role: Optional[str], cached_result: Dict) -> Dict:
+        """Count a cache hit and save the cached result for the document"""
+        self.cache_hits += 1
+        # If cached, ensure it has the necessary structure for saving
+        if "classification" in cached_result and "relationships" in cached_result:
+            # Simulate processing time for cached results if needed for metadata
+            cached_result["processing_time_seconds"] = 0.0 # Or retrieve from cache metadata
+            await self._save(document, cached_result, role)
+        return cached_result
+
+    async def _classify_uncached(self, document: Dict, role: Optional[str], cache_key: str,
+                                 deadline: Union[Deadline, float, None] = None) -> Dict:
+        """Run preprocessing, LLM classification and relationship extraction, then cache and save the result"""
+        deadline = Deadline.coerce(deadline if deadline is not None else self.deadline_seconds)
+        original_content = document.get("content", "")
 
-        # Preprocess text
-        processed_content = preprocess_text(original_content)
+        # Preprocess text; this and the other CPU-heavy stages run off the event loop
+        processed_content = await asyncio.to_thread(preprocess_text, original_content)
 
         # Start timing for classification
-        import time
         start_time = time.time()
 
-        # Get classification from LLM
-        classification = await self.llm_client.classify(
-            content=processed_content,
-            role=role
-        )
+        # Get classification from LLM, or from the recorded response in replay mode
+        degraded = False
+        if self.replay_mode:
+            classification = await self._replay_classification(cache_key)
+        else:
+            try:
+                classification = await self.llm_client.classify(
+                    content=processed_content,
+                    role=role,
+                    deadline=deadline,
+                    content_length=self._content_length(document)
+                )
+            except DeadlineExceededError as e:
+                # Out of time: answer now with a rule-based result and classify properly later
+                classification = await self.error_handler.handle_error(e, {"document": document, "role": role})
+                degraded = True
+        # The preprocessed copy is only needed for the prompt; free it before the remaining stages
+        del processed_content
 
         # Extract relationships
-        relationships = self._extract_relationships(document)
+        relationships = await asyncio.to_thread(self._extract_relationships, document)
 
         end_time = time.time()
         processing_time = end_time - start_time
 
+        return await self._store_result(document, role, cache_key, classification, relationships, processing_time, degraded)
+
+    async def _store_result(self, document: Dict, role: Optional[str], cache_key: str, classification: Dict,
+                            relationships: Dict, processing_time: float, degraded: bool = False) -> Dict:
+        """Record the raw response, then cache, store and save a finished classification"""
+        raw_response = classification.pop("raw_response", None)
+        if raw_response and self.record_responses:
+            await self.recorder.arecord(cache_key, raw_response, document)
+
         # Store results
         result = {
             "classification": classification,
             "relationships": relationships,
             "processing_time_seconds": processing_time # Add processing time to result
         }
-        self.cache.set(cache_key, result)
+        if degraded:
+            # Degraded results are not cached, so the re-run reaches the LLM
+            result["degraded"] = True
+            if self.requeue_degraded:
+                await self._queue_rerun(document, role)
+        else:
+            await self.cache.aset(cache_key, result)
         if document.get("id"):
-            self.relationship_store.store(str(document["id"]), relationships)
+            await self.relationship_store.astore(str(document["id"]), relationships)
 
         # Save the classified document to file
-        self.file_saver.save_classified_document(
+        await self._save(document, result, role)
+
+        return result
+
+    async def _save(self, document: Dict, result: Dict, role: Optional[str]) -> None:
+        """Save a classified document to file on a worker thread, keeping JSON encoding off the event loop"""
+        await asyncio.to_thread(
+            self.file_saver.save_classified_document,
             original_document_data=document, # Pass the entire document dict
             classification_result=result,
-            original_filename=original_filename
+            original_filename=document.get("filename", "unknown_file"),
+            role=role
         )
 
-        return result
+    async def classify_document_all_roles(self, document: Dict, roles: Optional[Iterable[Optional[str]]] = None,
+                                          deadline: Union[Deadline, float, None] = None) -> Dict[str, Dict]:
+        """
+        Classify a document for several roles with a single LLM request.
+
+        Roles that are already cached are served from the cache. The remaining roles
+        are classified together and each result is cached under its own role's key;
+        roles below the confidence threshold are escalated from the combined request's
+        tier. If the combined response cannot be parsed, or there is only one role to
+        classify, the roles fall back to individual classify_document calls.
+
+        Args:
+            document (Dict): The document to classify, as for classify_document.
+            roles (Optional[Iterable[Optional[str]]]): Roles to classify; defaults to ALL_ROLES.
+            deadline (Union[Deadline, float, None]): Time budget shared by all roles.
+
+        Returns:
+            Dict[str, Dict]: Classification result per role name ("default" for no role).
+        """
+        roles = list(ALL_ROLES if roles is None else roles)
+        deadline = Deadline.coerce(deadline if deadline is not None else self.deadline_seconds)
+        results = {}
+        missing = []
+        for role in roles:
+            cached_result = await self.cache.aget(self._generate_cache_key(document, role))
+            if cached_result:
+                self.cache_lookups += 1
+                results[role or DEFAULT_ROLE] = await self._serve_cached(document, role, cached_result)
+            else:
+                missing.append(role) # Its lookup is counted below, once it is classified
+
+        classifications = {}
+        if len(missing) > 1 and not self.replay_mode:
+            start_time = time.time()
+            try:
+                processed_content = await asyncio.to_thread(preprocess_text, document.get("content", ""))
+                classifications = await self.llm_client.classify_multi_role(
+                    processed_content, missing, deadline, self._content_length(document)
+                )
+                del processed_content
+            except ResponseParseError as e:
+                print(f"Combined classification could not be parsed ({e}); classifying roles separately")
+            except DeadlineExceededError:
+                pass # The per-role calls below return degraded results
+            if classifications:
+                relationships = await asyncio.to_thread(self._extract_relationships, document)
+                processing_time = time.time() - start_time
+
+        for role in missing:
+            name = role or DEFAULT_ROLE
+            if name in classifications:
+                self.cache_lookups += 1 # A miss; the roles falling back below count theirs in classify_document
+                results[name] = await self._store_result(
+                    document, role, self._generate_cache_key(document, role),
+                    classifications[name], relationships, processing_time
+                )
+            else:
+                results[name] = await self.classify_document(document, role, deadline)
+        return results
+
+    @staticmethod
+    def _content_length(document: Dict) -> int:
+        """Length of the whole document for routing; the prompt text is preprocessed and capped"""
+        return document.get("content_size") or len(document.get("content", ""))
+
+    def routing_stats(self) -> Dict[str, Dict]:
+        """Per-tier call counts, latency and cost of this classifier's LLM calls ({} in replay mode)"""
+        return self.llm_client.routing_stats() if self.llm_client else {}
+
+    async def is_cached(self, document: Dict, role: Optional[str] = None) -> bool:
+        """Whether a classification of the document for the role is in the cache"""
+        return await self.cache.aget(self._generate_cache_key(document, role)) is not None
+
+    async def _queue_rerun(self, document: Dict, role: Optional[str]) -> None:
+        """Put the file behind a degraded result back on the job queue"""
+        file_path = document.get("file_path")
+        if not file_path:
+            print(f"Degraded result for {document.get('filename', 'unknown_file')} has no file path; not queued for re-run")
+            return
+        from storage.job_queue import JobQueue
+        if self._rerun_queue is None:
+            self._rerun_queue = JobQueue()
+        # Jobs are enqueued by absolute path; a relative --file path would otherwise queue the file twice
+        await asyncio.to_thread(self._rerun_queue.requeue, [str(Path(file_path).resolve())], role)
+
+    async def replay(self) -> int:
+        """Re-derive cached results and saved outputs from all recorded LLM responses.
+
+        Parsing, relationship extraction, caching and saving run as in a live
+        classification, but with zero API calls. Returns the number replayed.
+        """
+        replayed = 0
+        for recording in self.recorder.iter_recordings():
+            await self._classify_uncached(
+                Document.from_dict(recording["document"]),
+                recording["metadata"].get("role"),
+                recording["cache_key"]
+            )
+            replayed += 1
+        return replayed
+
+    async def _replay_classification(self, cache_key: str) -> Dict:
+        """Parse the recorded completion for a cache key as if it had just been received"""
+        recording = await self.recorder.aget(cache_key)
+        if recording is None:
+            raise LookupError(f"No recorded LLM response for cache key {cache_key}")
+        metadata = recording["metadata"]
+        if self.simulate_latency:
+            await asyncio.sleep(metadata.get("latency_seconds", 0.0))
+        if metadata.get("multi_role"):
+            # Recorded from a combined request; take this role's block
+            name = metadata["multi_role"]
+            classification = OpenRouterClient._parse_multi_role_response(
+                recording["raw_response"], recording["model"], [name]
+            )[name]
+        else:
+            classification = OpenRouterClient._parse_classification_response(
+                recording["raw_response"], recording["model"]
+            )
+        if metadata.get("routing_tier"):
+            classification["routing_tier"] = metadata["routing_tier"]
+        return classification
+
+    def _generate_cache_key(self, document: Dict, role: Optional[str] = None) -> str:
+        """Generate a unique cache key for the document and role"""
+        # A stable digest (unlike hash()) keeps keys valid across processes and nodes
+        digest = hashlib.sha256(document.get("content", "").encode("utf-8"))
+        if document.get("content_truncated"):
+            # Content is only a prefix of the file. Source is just the parent directory,
+            # so add the file name as well as the size to tell apart files sharing the prefix
+            digest.update(f"\0{document.get('content_size')}\0{document.get('filename', '')}".encode("utf-8"))
+        key = f"{self._cache_source(document)}_{digest.hexdigest()}"
+        return f"{key}_{role}" if role else key
 
-    def _generate_cache_key(self, document: Dict) -> str:
-        """Generate a unique cache key for the document"""
-        content_hash = hash(document.get("content", ""))
-        return f"{document.get('source', '')}_{content_hash}"
+    def _cache_source(self, document: Dict) -> str:
+        """Source part of a cache key: the file's directory relative to CORPUS_ROOT, if set and
+        the source is that directory, otherwise the source as given"""
+        source = document.get("source", "")
+        file_path = document.get("file_path")
+        if self.corpus_root is None or not file_path or source != str(Path(file_path).parent):
+            return source
+        try:
+            return Path(source).resolve().relative_to(self.corpus_root).as_posix()
+        except ValueError:
+            return source # Outside the corpus root
 
     def _extract_relationships(self, document: Dict) -> Dict:
         """Extract relationships from document content using RelationshipExtractor"""
         from core.relationship_extractor import RelationshipExtractor
         extractor = RelationshipExtractor()
+        if document.get("content_truncated") and document.get("content_path"):
+            # Only a prefix was read for classification; scan the full file from disk
+            return extractor.extract_relationships_from_file(document["content_path"])
         content = document.get("content", "")
         return extractor.extract_relationships(content)
\ No newline at end of file
@@ -0,0 +1,33 @@
+import time
+from typing import Optional, Union
+from core.error_handling import DeadlineExceededError
+
+class Deadline:
+    """End-to-end time budget for classifying one document (or a whole batch).
+
+    The same Deadline is passed down through the model fallback chain and the
+    retries, each of which only gets the time that is left.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def coerce(cls, value: Union["Deadline", float, None]) -> Optional["Deadline"]:
+        """Accept a Deadline, a budget in seconds, or None for no limit"""
+        if value is None or isinstance(value, Deadline):
+            return value
+        return cls(float(value))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def check(self, stage: str = "") -> None:
+        """Raise DeadlineExceededError if the budget is used up"""
+        if self.expired():
+            where = f" before {stage}" if stage else ""
+            raise DeadlineExceededError(f"Deadline of {self.budget:.1f}s exceeded{where}")
@@ -0,0 +1,143 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional
+
+# Stands in for the original document's "content" value, which is the record's own content
+_CONTENT = object()
+# Held in place of the content after release(); None is a valid (if empty) content value
+_RELEASED = object()
+
+class DocumentReleasedError(RuntimeError):
+    """Raised when a document's content is read after release()"""
+
+class Document(Mapping):
+    """Compact, read-only document record passed through the classification pipeline.
+
+    The content string is held once and shared by every stage; the original document
+    (written to the output file) is rebuilt on demand around that same string instead
+    of being kept as a second dict. Documents read as the plain dicts the pipeline has
+    always used, so document.get("content") and dict(document) keep working.
+    Call release() once a document is finished to drop its content early.
+    """
+
+    __slots__ = ("_content", "source", "filename", "file_path", "content_truncated", "content_path",
+                 "content_size", "_fields", "_original")
+
+    _ATTRIBUTES = ("source", "filename", "file_path", "content_truncated", "content_path", "content_size")
+
+    def __init__(self, content: str, source: str, filename: str, file_path: Optional[str] = None,
+                 original: Optional[Dict] = None, content_truncated: bool = False,
+                 content_path: Optional[str] = None, content_size: Optional[int] = None, **fields):
+        """
+        Args:
+            content (str): Text to classify.
+            source (str): Original path or source name.
+            filename (str): Original filename, used for the output filename.
+            file_path (Optional[str]): File the document came from, used for re-runs.
+            original (Optional[Dict]): The original document to save alongside the result;
+                                       defaults to {"content": content}.
+            content_truncated (bool): Content is only a prefix of the file at content_path.
+            content_path (Optional[str]): Full file to scan for relationships when truncated.
+            content_size (Optional[int]): Size of the full file when truncated.
+            **fields: Any other document fields (id, title, url, ...).
+        """
+        self._content = content
+        self.source = source
+        self.filename = filename
+        self.file_path = file_path
+        self.content_truncated = content_truncated
+        self.content_path = content_path
+        self.content_size = content_size
+        self._fields = fields
+        if original is None:
+            original = {"content": content}
+        # Keep the original without its content, which would otherwise be held twice
+        self._original = {
+            key: _CONTENT if key == "content" and value is content else value
+            for key, value in original.items()
+        }
+
+    @classmethod
+    def from_dict(cls, document: Mapping) -> "Document":
+        """Build a record from a pipeline document dict"""
+        if isinstance(document, Document):
+            return document
+        fields = dict(document)
+        content = fields.pop("content", "")
+        original = fields.pop("original_document_content", None)
+        if original is not None and not isinstance(original, dict):
+            original = {"content": original}
+        if fields.pop("original_content_shared", False) and original is not None:
+            # Written by to_record(): the original's content is the document content
+            original = {**original, "content": content}
+        return cls(
+            content=content,
+            source=fields.pop("source", "unknown_path"),
+            filename=fields.pop("filename", "unknown_file"),
+            original=original,
+            **fields
+        )
+
+    def to_record(self) -> Dict:
+        """Dict form for persisting, with the content written once rather than also inside the original"""
+        record = {key: self[key] for key in self._keys() if key != "original_document_content"}
+        record["original_document_content"] = {
+            key: None if value is _CONTENT else value for key, value in self._original.items()
+        }
+        if any(value is _CONTENT for value in self._original.values()):
+            record["original_content_shared"] = True
+        return record
+
+    @property
+    def content(self) -> str:
+        if self._content is _RELEASED:
+            raise DocumentReleasedError(f"Content of {self.filename} was already released")
+        return self._content
+
+    @property
+    def original(self) -> Dict:
+        """The original document, sharing this record's content string"""
+        return {key: self.content if value is _CONTENT else value for key, value in self._original.items()}
+
+    @property
+    def released(self) -> bool:
+        return self._content is _RELEASED
+
+    def release(self) -> None:
+        """Drop the content so it can be freed while the record itself is still referenced"""
+        self._content = _RELEASED
+        self._original = {key: value for key, value in self._original.items() if value is not _CONTENT}
+
+    @staticmethod
+    def _is_set(value: Any) -> bool:
+        # Unset optional attributes are left out, as they were from the old document dicts
+        return value is not None and value is not False
+
+    def _keys(self) -> Iterator[str]:
+        yield "content"
+        for name in self._ATTRIBUTES:
+            if self._is_set(getattr(self, name)):
+                yield name
+        yield from self._fields
+        yield "original_document_content"
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "content":
+            return self.content
+        if key == "original_document_content":
+            return self.original
+        if key in self._ATTRIBUTES:
+            value = getattr(self, key)
+            if not self._is_set(value):
+                raise KeyError(key)
+            return value
+        return self._fields[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return self._keys()
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._keys())
+
+    def __repr__(self) -> str:
+        state = "released" if self.released else f"{len(self._content or '')} chars"
+        return f"Document({self.source!r}, {self.filename!r}, {state})"
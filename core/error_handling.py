@@ -19,6 +19,14 @@ class ConfidenceError(ClassificationError):
     """Classification confidence too low"""
     pass
 
+class DeadlineExceededError(ClassificationError):
+    """Per-document time budget used up"""
+    pass
+
+class ResponseParseError(ClassificationError):
+    """LLM response does not have the requested structure"""
+    pass
+
 class ErrorSeverity(Enum):
     LOW = "low"
     MEDIUM = "medium"
@@ -31,7 +39,8 @@ class ErrorHandler:
         self.fallback_strategies = {
             LLMServiceError: self._handle_llm_service_error,
             ValidationError: self._handle_validation_error,
-            ConfidenceError: self._handle_confidence_error
+            ConfidenceError: self._handle_confidence_error,
+            DeadlineExceededError: self._handle_deadline_exceeded
         }
     
     async def handle_error(self, error: Exception, context: Dict) -> Optional[Dict]:
@@ -77,11 +86,19 @@ class ErrorHandler:
     
     async def _handle_confidence_error(self, error: ConfidenceError, context: Dict) -> Optional[Dict]:
         """Handle low confidence classifications"""
-        # Try with a more powerful model
+        # Try with a more powerful model tier
         try:
             from models.llm_client import LLMClient
-            premium_client = LLMClient()
-            return await premium_client.classify(context["document"].get("content", ""), role="CODE")
+            premium_client = context.get("llm_client") or LLMClient()
+            next_tier = premium_client.router.escalate(context.get("tier"))
+            if next_tier is None:
+                raise error  # Already on the strongest tier
+            return await premium_client.classify(
+                context["document"].get("content", ""),
+                role=context.get("role"),
+                tier=next_tier,
+                deadline=context.get("deadline")
+            )
         except Exception:
             # Return low-confidence result with warning
             result = context.get("partial_result", {})
@@ -89,6 +106,13 @@ class ErrorHandler:
             result["confidence"] = max(result.get("confidence", 0.0), 0.3)  # Minimum confidence
             return result
     
+    async def _handle_deadline_exceeded(self, error: DeadlineExceededError, context: Dict) -> Dict:
+        """Return a fast rule-based result, marked as degraded, when the time budget runs out"""
+        result = await self._rule_based_fallback(context)
+        result["degraded"] = True
+        result["degraded_reason"] = str(error)
+        return result
+    
     async def _generic_fallback(self, error: Exception, context: Dict) -> Dict:
         """Generic fallback when no specific handler exists"""
         return await self._rule_based_fallback(context)
@@ -150,7 +174,7 @@ class ErrorHandler:
         """Determine error severity for monitoring and alerting"""
         if isinstance(error, ValidationError):
             return ErrorSeverity.LOW
-        elif isinstance(error, ConfidenceError):
+        elif isinstance(error, (ConfidenceError, DeadlineExceededError)):
             return ErrorSeverity.MEDIUM
         elif isinstance(error, LLMServiceError):
             return ErrorSeverity.HIGH
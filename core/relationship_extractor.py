@@ -1,5 +1,34 @@
+import mmap
 import re
-from typing import Dict, List
+from typing import Dict, Iterable, List
+
+# Bytes patterns match \w, \s and \d as ASCII only; non-ASCII UTF-8 bytes are added to these
+# classes so that candidate matches in a file cover everything the text patterns would match
+_NON_ASCII = r"\x80-\xff"
+_WIDENED_CLASSES = (r"\w", r"\s", r"\d")
+
+def _widen_for_bytes(pattern: str) -> bytes:
+    r"""Bytes version of a text pattern whose \w, \s and \d also match non-ASCII bytes"""
+    widened = []
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escape = pattern[i:i + 2]
+            if escape in _WIDENED_CLASSES:
+                widened.append(f"{escape}{_NON_ASCII}" if in_class else f"[{escape}{_NON_ASCII}]")
+            else:
+                widened.append(escape)
+            i += 2
+            continue
+        if char == "[" and not in_class:
+            in_class = True
+        elif char == "]" and in_class:
+            in_class = False
+        widened.append(char)
+        i += 1
+    return "".join(widened).encode()
 
 class RelationshipExtractor:
     """Extracts relationships from document/code content using pattern matching."""
@@ -42,6 +71,50 @@ class RelationshipExtractor:
         Returns:
             Dictionary mapping relationship types to lists of matches
         """
+        return self._collect(
+            (rel_type, re.findall(pattern, content, re.IGNORECASE))
+            for rel_type, patterns in self.patterns.items()
+            for pattern in patterns
+        )
+
+    def extract_relationships_from_file(self, file_path: str) -> Dict[str, List[str]]:
+        """Extract relationships from a file without reading it into memory.
+
+        The patterns run over a read-only memory map of the file, so matches are
+        found across the whole file with no chunk boundaries to stitch, and the
+        pages are file-backed rather than held on the heap. Each bytes match is
+        decoded and matched again with the text pattern, so non-ASCII text gives
+        the same relationships as extract_relationships().
+
+        Args:
+            file_path: Path to the text file to analyze
+
+        Returns:
+            Dictionary mapping relationship types to lists of matches
+        """
+        with open(file_path, 'rb') as f:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty files cannot be mapped
+                return {}
+            with mapped:
+                return self._collect(
+                    (rel_type, self._findall_mapped(pattern, mapped))
+                    for rel_type, patterns in self.patterns.items()
+                    for pattern in patterns
+                )
+
+    @staticmethod
+    def _findall_mapped(pattern: str, mapped: mmap.mmap) -> List:
+        """re.findall of a text pattern over a memory-mapped UTF-8 file"""
+        text_pattern = re.compile(pattern, re.IGNORECASE)
+        matches = []
+        for candidate in re.finditer(_widen_for_bytes(pattern), mapped, re.IGNORECASE):
+            matches.extend(text_pattern.findall(candidate.group().decode('utf-8', errors='replace')))
+        return matches
+
+    def _collect(self, found: Iterable) -> Dict[str, List[str]]:
+        """Merge (relationship type, findall matches) pairs into a relationship dict"""
         relationships = {
             "requires": [],
             "integrates_with": [],
@@ -50,19 +123,17 @@ class RelationshipExtractor:
             "prerequisites": []
         }
 
-        for rel_type, patterns in self.patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                if matches:
-                    # Flatten any capture groups and deduplicate
-                    cleaned_matches = set()
-                    for match in matches:
-                        if isinstance(match, tuple):
-                            cleaned_matches.update(m for m in match if m)
-                        elif match:
-                            cleaned_matches.add(match)
-                    
-                    relationships[rel_type].extend(cleaned_matches)
+        for rel_type, matches in found:
+            if matches:
+                # Flatten any capture groups and deduplicate
+                cleaned_matches = set()
+                for match in matches:
+                    if isinstance(match, tuple):
+                        cleaned_matches.update(m for m in match if m)
+                    elif match:
+                        cleaned_matches.add(match)
+                
+                relationships[rel_type].extend(cleaned_matches)
 
         # Remove empty relationship types
-        return {k: list(set(v)) for k, v in relationships.items() if v}
\ No newline at end of file
+        return {k: list(set(v)) for k, v in relationships.items() if v}
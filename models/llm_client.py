@@ -1,10 +1,105 @@
-from typing import Dict, Optional
-from models.openrouter_client import OpenRouterClient
+import asyncio
+import time
+from typing import Dict, List, Optional
+from core.deadline import Deadline
+from core.error_handling import ConfidenceError, ErrorHandler
+from models.model_router import ModelRouter
+from models.openrouter_client import DEFAULT_ROLE, OpenRouterClient
 
 class LLMClient:
     def __init__(self):
         self.client = OpenRouterClient()
+        self.router = ModelRouter()
+        self.error_handler = ErrorHandler()
 
-    async def classify(self, content: str, role: Optional[str] = None) -> Dict:
-        """Classify content using OpenRouter with DeepSeek model and fallbacks"""
-        return await self.client.classify(content, role)
\ No newline at end of file
+    async def classify(self, content: str, role: Optional[str] = None, tier: Optional[str] = None,
+                       deadline: Optional[Deadline] = None, content_length: Optional[int] = None) -> Dict:
+        """Classify content on a routed model tier, escalating low-confidence results.
+
+        content_length is the length of the full document, for routing when content is
+        a preprocessed or truncated copy. Raises DeadlineExceededError if the deadline
+        runs out before any model answers.
+        """
+        tier = tier or self.router.select_tier(content, role, content_length)
+        models = self.router.models_for(tier)
+
+        start_time = time.time()
+        classification = await self.client.classify(
+            content, role, model=models[0], fallbacks=models[1:], deadline=deadline
+        )
+        latency = time.time() - start_time
+
+        usage = classification.pop("usage", None) or {}
+        confident = self.router.is_confident(classification)
+        self.router.record(tier, classification.get("model_used", models[0]), latency, usage, confident)
+        classification["routing_tier"] = tier
+        if "raw_response" in classification:
+            classification["raw_response"].update(latency_seconds=latency, routing_tier=tier, role=role)
+
+        if not confident:
+            return await self._escalate(content, role, tier, classification, deadline)
+        return classification
+
+    async def classify_multi_role(self, content: str, roles: List[Optional[str]],
+                                  deadline: Optional[Deadline] = None,
+                                  content_length: Optional[int] = None) -> Dict[str, Dict]:
+        """Classify content for several roles in a single request.
+
+        Returns one classification per role name ("default" for no role). Roles whose
+        classification falls below the confidence threshold are retried individually,
+        starting on the tier above the one the combined request ran on. Raises
+        ResponseParseError if the combined response cannot be split into role blocks.
+        """
+        tier = self.router.select_tier_for_roles(content, roles, content_length)
+        models = self.router.models_for(tier)
+
+        start_time = time.time()
+        response = await self.client.classify(
+            content, model=models[0], fallbacks=models[1:], deadline=deadline, roles=roles
+        )
+        latency = time.time() - start_time
+
+        classifications = response["roles"]
+        model_used = next(iter(classifications.values()))["model_used"]
+        confident = {name for name, c in classifications.items() if self.router.is_confident(c)}
+        self.router.record(tier, model_used, latency, response.get("usage") or {}, len(confident) == len(classifications))
+
+        raw_response = response.get("raw_response")
+        for name, classification in classifications.items():
+            classification["routing_tier"] = tier
+            if raw_response:
+                # Each role keeps a copy of the combined completion, tagged with its block
+                classification["raw_response"] = dict(
+                    raw_response, latency_seconds=latency, routing_tier=tier, multi_role=name,
+                    role=None if name == DEFAULT_ROLE else name
+                )
+
+        low_confidence = [name for name in classifications if name not in confident]
+        escalated = await asyncio.gather(*(
+            self._escalate(content, None if name == DEFAULT_ROLE else name, tier, classifications[name], deadline)
+            for name in low_confidence
+        ))
+        classifications.update(zip(low_confidence, escalated))
+        return classifications
+
+    async def _escalate(self, content: str, role: Optional[str], tier: str, classification: Dict,
+                        deadline: Optional[Deadline]) -> Dict:
+        """Hand a low-confidence result to the confidence path, which retries on the next stronger tier"""
+        return await self.error_handler.handle_error(
+            ConfidenceError(
+                f"Confidence {classification.get('confidence', 0.0)} below "
+                f"{self.router.confidence_threshold} on tier '{tier}'"
+            ),
+            {
+                "document": {"content": content},
+                "partial_result": classification,
+                "role": role,
+                "tier": tier,
+                "deadline": deadline,
+                "llm_client": self
+            }
+        )
+
+    def routing_stats(self) -> Dict[str, Dict]:
+        """Per-tier call counts, latency and cost for tuning routing thresholds"""
+        return self.router.report()
@@ -0,0 +1,119 @@
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+import yaml
+
+ROUTING_CONFIG = yaml.safe_load((Path(__file__).parent.parent / "config" / "model_routing.yaml").read_text())
+
+class TierStats:
+    """Running latency, token and cost totals for one model tier."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.low_confidence = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "avg_latency_seconds": self.total_latency / self.calls if self.calls else 0.0,
+            "max_latency_seconds": self.max_latency,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost, 6),
+            "avg_cost_usd": round(self.cost / self.calls, 6) if self.calls else 0.0,
+            "low_confidence": self.low_confidence
+        }
+
+class ModelRouter:
+    """Picks a model tier per document and tracks per-tier latency and cost.
+
+    Tiers, token limits, roles and prices come from config/model_routing.yaml so
+    that thresholds can be retuned from the collected stats without code changes.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config or ROUTING_CONFIG
+        self.tiers: List[Dict] = config["tiers"]
+        self.prices: Dict[str, Dict] = config.get("model_prices", {})
+        self.chars_per_token = config.get("chars_per_token", 4)
+        self.confidence_threshold = float(
+            os.getenv("ROUTER_CONFIDENCE_THRESHOLD", config.get("confidence_threshold", 0.6))
+        )
+        self.stats: Dict[str, TierStats] = {tier["name"]: TierStats() for tier in self.tiers}
+        self.known_roles = {"default"} | {role for tier in self.tiers for role in tier.get("roles", [])}
+
+    def estimate_tokens(self, content: str) -> int:
+        return len(content) // self.chars_per_token
+
+    def select_tier(self, content: str, role: Optional[str] = None, content_length: Optional[int] = None) -> str:
+        """Return the first tier whose token limit and roles fit the document.
+
+        Tokens are estimated from content_length, the length of the full document, when
+        given; the content passed in may be a preprocessed or truncated copy. Roles no
+        tier lists are routed like the default role.
+        """
+        tokens = self.estimate_tokens(content) if content_length is None else content_length // self.chars_per_token
+        role = role or "default"
+        if role not in self.known_roles:
+            role = "default"
+        for tier in self.tiers:
+            if tier.get("escalation_only"):
+                continue
+            max_tokens = tier.get("max_content_tokens")
+            if max_tokens is not None and tokens > max_tokens:
+                continue
+            if role not in tier.get("roles", [role]):
+                continue
+            return tier["name"]
+        # Nothing fits: use the strongest tier that is not reserved for escalation
+        regular = [tier for tier in self.tiers if not tier.get("escalation_only")] or self.tiers
+        return regular[-1]["name"]
+
+    def select_tier_for_roles(self, content: str, roles: List[Optional[str]], content_length: Optional[int] = None) -> str:
+        """Return the strongest of the tiers the roles would be routed to individually"""
+        names = [tier["name"] for tier in self.tiers]
+        return max((self.select_tier(content, role, content_length) for role in roles), key=names.index)
+
+    def escalate(self, tier_name: Optional[str]) -> Optional[str]:
+        """Return the next stronger tier, or None if tier_name is already the strongest"""
+        names = [tier["name"] for tier in self.tiers]
+        if tier_name not in names:
+            return None
+        index = names.index(tier_name) + 1
+        return names[index] if index < len(names) else None
+
+    def models_for(self, tier_name: str) -> List[str]:
+        """Models of the tier followed by those of stronger tiers, for availability fallback"""
+        models = []
+        reached = False
+        for tier in self.tiers:
+            reached = reached or tier["name"] == tier_name
+            if reached:
+                models.extend(tier["models"])
+        return models
+
+    def is_confident(self, classification: Dict) -> bool:
+        return classification.get("confidence", 0.0) >= self.confidence_threshold
+
+    def record(self, tier_name: str, model: str, latency: float, usage: Dict, confident: bool) -> None:
+        """Record one completed call against its tier"""
+        stats = self.stats[tier_name]
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        price = self.prices.get(model, {})
+        stats.calls += 1
+        stats.total_latency += latency
+        stats.max_latency = max(stats.max_latency, latency)
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+        stats.cost += (prompt_tokens * price.get("prompt", 0.0) + completion_tokens * price.get("completion", 0.0)) / 1_000_000
+        if not confident:
+            stats.low_confidence += 1
+
+    def report(self) -> Dict[str, Dict]:
+        return {name: stats.as_dict() for name, stats in self.stats.items()}
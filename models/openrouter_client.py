@@ -1,8 +1,32 @@
 import os
 import json
+import asyncio
 import httpx
 from typing import Dict, Optional, List
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+from core.deadline import Deadline
+from core.error_handling import DeadlineExceededError, ResponseParseError
+
+DEFAULT_ROLE = "default"
+
+# Classification focus per role, shared by single-role and multi-role prompts
+ROLE_FOCUS = {
+    "CODE": "Implementation details, code quality, production readiness.",
+    "ARCHITECT": "System design patterns, architectural considerations, integration points.",
+}
+
+_retry_wait = wait_exponential(multiplier=1, min=4, max=10)
+
+def _stop_at_deadline(retry_state) -> bool:
+    """Stop retrying once the caller's deadline has passed"""
+    deadline = retry_state.kwargs.get("deadline")
+    return deadline is not None and deadline.expired()
+
+def _wait_within_deadline(retry_state) -> float:
+    """Exponential backoff, never sleeping past the caller's deadline"""
+    wait = _retry_wait(retry_state)
+    deadline = retry_state.kwargs.get("deadline")
+    return wait if deadline is None else min(wait, deadline.remaining())
 
 class OpenRouterClient:
     """Client for interacting with OpenRouter API with support for multiple models."""
@@ -36,8 +60,10 @@ class OpenRouterClient:
         }
 
     @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=10)
+        stop=stop_after_attempt(3) | _stop_at_deadline,
+        wait=_wait_within_deadline,
+        retry=retry_if_not_exception_type((DeadlineExceededError, ResponseParseError)),
+        reraise=True
     )
     async def classify(
         self,
@@ -46,15 +72,39 @@ class OpenRouterClient:
         model: Optional[str] = None,
         title: str = "",
         url: str = "",
-        source: str = ""
+        source: str = "",
+        fallbacks: Optional[List[str]] = None,
+        deadline: Optional[Deadline] = None,
+        roles: Optional[List[Optional[str]]] = None
     ) -> Dict:
-        """Classify content using specified model or fallback strategy."""
+        """Classify content using specified model or fallback strategy.
+
+        With a deadline, each model attempt only gets the remaining budget, and
+        DeadlineExceededError is raised (and not retried) once it runs out.
+
+        With roles, all of them are classified in a single request and the result
+        holds one classification per role name under "roles". ResponseParseError
+        is raised (and not retried) if the combined response cannot be split up.
+        """
         model = model or self.models["primary"]
-        models_to_try = [model] + self.models["fallbacks"]
+        models_to_try = [model] + (self.models["fallbacks"] if fallbacks is None else fallbacks)
         
         for current_model in models_to_try:
             try:
-                return await self._classify_with_model(content, role, current_model, title, url, source)
+                if deadline is None:
+                    return await self._classify_with_model(content, role, current_model, title, url, source, roles)
+                deadline.check(f"trying {current_model}")
+                return await asyncio.wait_for(
+                    self._classify_with_model(content, role, current_model, title, url, source, roles),
+                    timeout=deadline.remaining()
+                )
+            except (DeadlineExceededError, ResponseParseError):
+                raise
+            except asyncio.TimeoutError:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceededError(f"Deadline of {deadline.budget:.1f}s exceeded waiting for {current_model}")
+                print(f"Model {current_model} timed out")
+                continue # Try next fallback model
             except httpx.HTTPStatusError as e:
                 if e.response.status_code == 401:
                     print(f"Model {current_model} failed: 401 Unauthorized. Please check your OPENROUTER_API_KEY for validity.")
@@ -65,6 +115,8 @@ class OpenRouterClient:
                 print(f"Model {current_model} failed with unexpected error: {str(e)}")
                 continue # Try next fallback model
                 
+        if deadline is not None:
+            deadline.check("retrying")
         raise Exception("All model attempts failed. Please ensure your API keys are valid and check network connectivity.")
 
     async def _classify_with_model(
@@ -74,10 +126,14 @@ class OpenRouterClient:
         model: str,
         title: str = "",
         url: str = "",
-        source: str = ""
+        source: str = "",
+        roles: Optional[List[Optional[str]]] = None
     ) -> Dict:
         """Perform classification with a specific model."""
-        prompt = self._build_prompt(content, role, title, url, source)
+        if roles:
+            prompt = self._build_multi_role_prompt(content, roles, title, url, source)
+        else:
+            prompt = self._build_prompt(content, role, title, url, source)
         
         payload = {
             "model": model,
@@ -85,7 +141,8 @@ class OpenRouterClient:
                 "role": "user",
                 "content": prompt
             }],
-            "max_tokens": 1000,
+            # One classification block per role
+            "max_tokens": 1000 * len(roles) if roles else 1000,
             "temperature": 0.1
         }
         
@@ -99,25 +156,28 @@ class OpenRouterClient:
             result = response.json()
             
             content = result["choices"][0]["message"]["content"]
-            return self._parse_classification_response(content, model)
+            if roles:
+                classification = {"roles": self._parse_multi_role_response(content, model, roles)}
+            else:
+                classification = self._parse_classification_response(content, model)
+            # Token usage for cost tracking; LLMClient removes it before returning
+            classification["usage"] = result.get("usage", {})
+            # Raw completion for record/replay; DocumentClassifier removes it before caching
+            classification["raw_response"] = {
+                "content": content,
+                "model": model,
+                "response_model": result.get("model"),
+                "id": result.get("id"),
+                "created": result.get("created"),
+                "usage": result.get("usage", {})
+            }
+            return classification
 
-    def _parse_classification_response(self, content: str, model: str) -> Dict:
+    @staticmethod
+    def _parse_classification_response(content: str, model: str) -> Dict:
         """Parse the LLM response into structured classification data."""
         try:
-            # Remove markdown code block fences if present
-            if content.startswith("```json") and content.endswith("```"):
-                content = content[len("```json"): -len("```")].strip()
-            
-            result = json.loads(content)
-            return {
-                "section_hierarchy": result.get("section_hierarchy", []),
-                "tags": result.get("tags", []),
-                "refined_source": result.get("refined_source", ""),
-                "collection": result.get("collection", ""),
-                "topics": result.get("topics", []),
-                "confidence": result.get("confidence", 0.0),
-                "model_used": model
-            }
+            return OpenRouterClient._normalize_classification(OpenRouterClient._load_json(content), model)
         except json.JSONDecodeError:
             return {
                 "section_hierarchy": [],
@@ -129,8 +189,73 @@ class OpenRouterClient:
                 "model_used": model
             }
 
+    @staticmethod
+    def _parse_multi_role_response(content: str, model: str, roles: List[Optional[str]]) -> Dict[str, Dict]:
+        """Split a multi-role response into one classification per role name.
+
+        Raises ResponseParseError if the response is not JSON or a role block is missing.
+        """
+        try:
+            result = OpenRouterClient._load_json(content)
+        except json.JSONDecodeError as e:
+            raise ResponseParseError(f"Multi-role response from {model} is not valid JSON: {e}")
+        classifications = {}
+        for role in roles:
+            name = role or DEFAULT_ROLE
+            block = result.get(name) if isinstance(result, dict) else None
+            if not isinstance(block, dict):
+                raise ResponseParseError(f"Multi-role response from {model} has no '{name}' block")
+            classifications[name] = OpenRouterClient._normalize_classification(block, model)
+        return classifications
+
+    @staticmethod
+    def _load_json(content: str):
+        # Remove markdown code block fences if present
+        if content.startswith("```json") and content.endswith("```"):
+            content = content[len("```json"): -len("```")].strip()
+        return json.loads(content)
+
+    @staticmethod
+    def _normalize_classification(result: Dict, model: str) -> Dict:
+        return {
+            "section_hierarchy": result.get("section_hierarchy", []),
+            "tags": result.get("tags", []),
+            "refined_source": result.get("refined_source", ""),
+            "collection": result.get("collection", ""),
+            "topics": result.get("topics", []),
+            "confidence": result.get("confidence", 0.0),
+            "model_used": model
+        }
+
+    def _build_multi_role_prompt(self, content: str, roles: List[Optional[str]], title: str = "", url: str = "", source: str = "") -> str:
+        """Build one prompt asking for a separate classification block per role."""
+        names = [role or DEFAULT_ROLE for role in roles]
+        focus = "".join(
+            f"\n            - `{name}`: {ROLE_FOCUS.get(name, 'A comprehensive classification of the content based on the taxonomy.')}"
+            for name in names
+        )
+        return self._build_base_prompt(content, title, url, source) + f"""
+            Classify the content separately for each of these roles, each with its own focus:{focus}
+
+            Return a single JSON object whose keys are exactly {", ".join(f'"{name}"' for name in names)}, and whose values are classification objects with the keys listed above.
+            """
+
     def _build_prompt(self, content: str, role: Optional[str], title: str = "", url: str = "", source: str = "") -> str:
         """Build classification prompt with pre-classification requirements, including taxonomy."""
+        base_prompt = self._build_base_prompt(content, title, url, source)
+        
+        if role in ROLE_FOCUS:
+            return base_prompt + f"""
+            Additional classification focus for '{role}' role:
+            - {ROLE_FOCUS[role]}
+            """
+        else:
+            return base_prompt + """
+            Provide a comprehensive classification of the content based on the taxonomy.
+            """
+
+    def _build_base_prompt(self, content: str, title: str = "", url: str = "", source: str = "") -> str:
+        """Build the role-independent part of the prompt, including taxonomy."""
         # Load taxonomy dynamically within the method to ensure it's always fresh
         from core.classifier import TAXONOMY
         
@@ -163,17 +288,4 @@ class OpenRouterClient:
 
         """
         
-        if role == "CODE":
-            return base_prompt + """
-            Additional classification focus for 'CODE' role:
-            - Implementation details, code quality, production readiness.
-            """
-        elif role == "ARCHITECT":
-            return base_prompt + """
-            Additional classification focus for 'ARCHITECT' role:
-            - System design patterns, architectural considerations, integration points.
-            """
-        else:
-            return base_prompt + """
-            Provide a comprehensive classification of the content based on the taxonomy.
-            """
\ No newline at end of file
+        return base_prompt
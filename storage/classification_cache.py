@@ -1,31 +1,43 @@
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
+import gzip
 import json
 import os
+from storage.storage_executor import StorageExecutor
+
+SNAPSHOT_FORMAT = "rag-classification-cache"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_BATCH_SIZE = 1000
 
 class ClassificationCache:
-    def __init__(self):
-        db_path = os.getenv("DATABASE_URL", "rag_classification.db")
-        self.conn = sqlite3.connect(db_path)
+    def __init__(self, executor: Optional[StorageExecutor] = None, taxonomy_version: Optional[str] = None):
+        self.executor = executor or StorageExecutor.shared()
+        # Recorded with each entry so snapshots can be filtered to one taxonomy
+        self.taxonomy_version = taxonomy_version
         self.ttl = timedelta(hours=int(os.getenv("CACHE_TTL_HOURS", "24")))
-        self._init_db()
+        self.executor.call(self._init_db, write=True)
 
-    def _init_db(self):
+    @staticmethod
+    def _init_db(conn: sqlite3.Connection):
         """Initialize database tables if they don't exist"""
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS classification_cache (
                 key TEXT PRIMARY KEY,
                 value TEXT,
-                expires_at TIMESTAMP
+                expires_at TIMESTAMP,
+                taxonomy_version TEXT
             )
         """)
-        self.conn.commit()
+        # Databases created before snapshots existed lack the taxonomy_version column
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(classification_cache)")]
+        if "taxonomy_version" not in columns:
+            cursor.execute("ALTER TABLE classification_cache ADD COLUMN taxonomy_version TEXT")
 
-    def get(self, key: str) -> Optional[Dict]:
-        """Get cached classification result"""
-        cursor = self.conn.cursor()
+    @staticmethod
+    def _get(conn: sqlite3.Connection, key: str) -> Optional[Dict]:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT value FROM classification_cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
             (key, datetime.utcnow())
@@ -35,23 +47,22 @@ class ClassificationCache:
             return json.loads(result[0])
         return None
 
-    def set(self, key: str, value: Dict) -> None:
-        """Cache classification result"""
-        expires_at = datetime.utcnow() + self.ttl if self.ttl else None
-        cursor = self.conn.cursor()
+    @staticmethod
+    def _set(conn: sqlite3.Connection, key: str, value: str, expires_at: Optional[datetime],
+             taxonomy_version: Optional[str]) -> None:
+        cursor = conn.cursor()
         cursor.execute(
             """
             INSERT OR REPLACE INTO classification_cache 
-            (key, value, expires_at)
-            VALUES (?, ?, ?)
+            (key, value, expires_at, taxonomy_version)
+            VALUES (?, ?, ?, ?)
             """,
-            (key, json.dumps(value), expires_at)
+            (key, value, expires_at, taxonomy_version)
         )
-        self.conn.commit()
 
-    def clear(self, pattern: str = "*") -> int:
-        """Clear cache entries matching pattern"""
-        cursor = self.conn.cursor()
+    @staticmethod
+    def _clear(conn: sqlite3.Connection, pattern: str) -> int:
+        cursor = conn.cursor()
         if pattern == "*":
             cursor.execute("DELETE FROM classification_cache")
         else:
@@ -59,10 +70,123 @@ class ClassificationCache:
                 "DELETE FROM classification_cache WHERE key LIKE ?",
                 (pattern.replace("*", "%"),)
             )
-        self.conn.commit()
         return cursor.rowcount
 
-    def __del__(self):
-        """Close database connection when instance is destroyed"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
\ No newline at end of file
+    def _expires_at(self) -> Optional[datetime]:
+        return datetime.utcnow() + self.ttl if self.ttl else None
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get cached classification result"""
+        return self.executor.call(self._get, key)
+
+    def set(self, key: str, value: Dict) -> None:
+        """Cache classification result"""
+        self.executor.call(self._set, key, json.dumps(value), self._expires_at(), self.taxonomy_version, write=True)
+
+    def clear(self, pattern: str = "*") -> int:
+        """Clear cache entries matching pattern"""
+        return self.executor.call(self._clear, pattern, write=True)
+
+    async def aget(self, key: str) -> Optional[Dict]:
+        """Get cached classification result without blocking the event loop"""
+        return await self.executor.run(self._get, key)
+
+    async def aset(self, key: str, value: Dict) -> None:
+        """Cache classification result without blocking the event loop; resolves once committed"""
+        await self.executor.run(self._set, key, json.dumps(value), self._expires_at(), self.taxonomy_version, write=True)
+
+    @staticmethod
+    def _export(conn: sqlite3.Connection, path: str, taxonomy_version: Optional[str]) -> int:
+        query = (
+            "SELECT key, value, expires_at, taxonomy_version FROM classification_cache "
+            "WHERE (expires_at IS NULL OR expires_at > ?)"
+        )
+        params: list = [datetime.utcnow()]
+        if taxonomy_version:
+            query += " AND taxonomy_version = ?"
+            params.append(taxonomy_version)
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+
+        exported = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            header = {
+                "format": SNAPSHOT_FORMAT,
+                "version": SNAPSHOT_VERSION,
+                "exported_at": datetime.utcnow().isoformat(),
+                "taxonomy_version": taxonomy_version
+            }
+            f.write(json.dumps(header) + "\n")
+            while True:
+                rows = cursor.fetchmany(SNAPSHOT_BATCH_SIZE)
+                if not rows:
+                    break
+                for key, value, expires_at, row_taxonomy_version in rows:
+                    # value is already JSON text and is kept as-is to avoid a decode/encode round trip
+                    f.write(json.dumps([key, value, expires_at, row_taxonomy_version], separators=(',', ':')) + "\n")
+                exported += len(rows)
+        return exported
+
+    @staticmethod
+    def _merge(conn: sqlite3.Connection, entries: List[Tuple]) -> int:
+        before = conn.total_changes
+        # Keep whichever copy expires later; NULL expires_at never expires
+        conn.executemany(
+            """
+            INSERT INTO classification_cache (key, value, expires_at, taxonomy_version)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value,
+                expires_at = excluded.expires_at,
+                taxonomy_version = excluded.taxonomy_version
+            WHERE classification_cache.expires_at IS NOT NULL
+              AND (excluded.expires_at IS NULL OR excluded.expires_at > classification_cache.expires_at)
+            """,
+            entries
+        )
+        return conn.total_changes - before
+
+    def export_snapshot(self, path: str, taxonomy_version: Optional[str] = None) -> int:
+        """Write unexpired entries to a gzip-compressed JSONL snapshot.
+
+        Rows are streamed from the database to the file, so memory use does not
+        grow with the size of the cache. Returns the number of entries written.
+        """
+        return self.executor.call(self._export, path, taxonomy_version)
+
+    def import_snapshot(self, path: str, taxonomy_version: Optional[str] = None) -> Tuple[int, int]:
+        """Merge a snapshot into the cache, keeping the newer expires_at per key.
+
+        Entries are read and merged in batches. Expired entries are skipped.
+        Returns (entries read, entries inserted or updated).
+        """
+        read = merged = 0
+        batch: List[Tuple] = []
+        for entry in self._iter_snapshot(path):
+            read += 1
+            if taxonomy_version and entry[3] != taxonomy_version:
+                continue
+            batch.append(entry)
+            if len(batch) >= SNAPSHOT_BATCH_SIZE:
+                merged += self.executor.call(self._merge, batch, write=True)
+                batch = []
+        if batch:
+            merged += self.executor.call(self._merge, batch, write=True)
+        return read, merged
+
+    @staticmethod
+    def _iter_snapshot(path: str) -> Iterator[Tuple]:
+        now = str(datetime.utcnow())
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"{path} is not a classification cache snapshot")
+            if header.get("version", 0) > SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {header.get('version')} in {path}")
+            for line in f:
+                if not line.strip():
+                    continue
+                key, value, expires_at, taxonomy_version = json.loads(line)
+                if expires_at is not None and expires_at <= now:
+                    continue
+                yield key, value, expires_at, taxonomy_version
@@ -0,0 +1,428 @@
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from storage.classification_cache import ClassificationCache
+from storage.file_saver import output_document_name
+from storage.relationship_store import RelationshipStore
+from storage.storage_executor import StorageExecutor
+
+# Optional dependencies: Parquet needs pyarrow, the fallback format needs only numpy
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MANIFEST_VERSION = 1
+EXPORT_BATCH_SIZE = 10000
+# Cache keys are "<source>_<sha256 of content>" with an optional "_<role>" suffix
+_CACHE_KEY = re.compile(r"^(.*)_([0-9a-f]{64})(?:_(.+))?$")
+
+# Columns holding codes into a manifest dictionary; list columns also have <name>_offsets
+DICTIONARY_COLUMNS = {
+    "classifications": {"role": "role", "collection": "collection", "model": "model",
+                        "taxonomy_version": "taxonomy_version", "tags": "tag", "topics": "topic"},
+    "edges": {"relationship_type": "relationship_type"},
+}
+LIST_COLUMNS = ("tags", "topics")
+_CODED_COLUMNS = {name for table in DICTIONARY_COLUMNS.values() for name in table}
+
+def available_backends() -> List[str]:
+    backends = []
+    if pa is not None:
+        backends.append("parquet")
+    if np is not None:
+        backends.append("numpy")
+    return backends
+
+class ColumnarExporter:
+    """Exports classification results and relationships as columnar datasets.
+
+    Layout of the output directory:
+        manifest.json                   dictionaries, watermarks and part lists
+        classifications/part-NNNNN.*    one row per classification
+        edges/part-NNNNN.*              one row per relationship from RelationshipStore
+
+    Collections, tags, topics, roles, models and relationship types are stored as
+    int32 codes into the manifest dictionaries, which only ever grow, so codes stay
+    valid across parts. Each export appends one part per table with the rows added
+    since the previous export; load_columnar() keeps only the last row per key, so
+    rows for a document that was re-classified supersede earlier ones. Parts are
+    Parquet files with pyarrow, else uncompressed .npz files.
+    """
+
+    def __init__(self, output_dir: str, backend: Optional[str] = None):
+        self.output_dir = Path(output_dir)
+        self.manifest_path = self.output_dir / "manifest.json"
+        self.manifest = self._load_manifest()
+        backend = backend or self.manifest.get("backend") or (available_backends() or [None])[0]
+        if backend is None:
+            raise ImportError("Columnar export needs pyarrow (Parquet) or numpy. Install one with pip.")
+        if backend not in ("parquet", "numpy"):
+            raise ValueError(f"Unknown columnar backend '{backend}'; use 'parquet' or 'numpy'.")
+        if backend not in available_backends():
+            raise ImportError(f"The '{backend}' backend needs {'pyarrow' if backend == 'parquet' else 'numpy'}.")
+        if self.manifest.get("backend", backend) != backend:
+            raise ValueError(f"{self.output_dir} was exported with the '{self.manifest['backend']}' backend.")
+        self.manifest["backend"] = backend
+        self.backend = backend
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.manifest["dictionaries"].items()}
+
+    def _load_manifest(self) -> Dict:
+        if self.manifest_path.exists():
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("version", 0) > MANIFEST_VERSION:
+                raise ValueError(f"Unsupported columnar manifest version {manifest.get('version')}")
+            return manifest
+        return {
+            "version": MANIFEST_VERSION,
+            "dictionaries": {name: [] for table in DICTIONARY_COLUMNS.values() for name in table.values()},
+            "watermarks": {},
+            "parts": {"classifications": [], "edges": []},
+        }
+
+    def _save_manifest(self) -> None:
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    def _code(self, dictionary: str, value: Optional[str]) -> int:
+        """Code for a value, adding it to the dictionary if new; -1 for missing values"""
+        if value is None or value == "":
+            return -1
+        codes = self._codes[dictionary]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.manifest["dictionaries"][dictionary].append(value)
+        return code
+
+    def export(self, source: str = "cache", executor: Optional[StorageExecutor] = None,
+               data_dir: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Append everything classified since the previous export.
+
+        Args:
+            source (str): "cache" reads the classification cache; "outputs" reads the
+                          JSON files saved under DATA_DIR.
+            executor (Optional[StorageExecutor]): Storage executor for the cache and
+                          relationship store; defaults to the shared one.
+            data_dir (Optional[str]): Saved outputs directory; defaults to DATA_DIR.
+
+        Returns:
+            Tuple[int, int]: Number of classification rows and edge rows appended.
+        """
+        executor = executor or StorageExecutor.shared()
+        # Make sure both tables exist, even on a database that has never been written
+        ClassificationCache(executor)
+        RelationshipStore(executor)
+        watermarks = self.manifest["watermarks"]
+        columns = self._empty_classification_columns()
+        if source == "cache":
+            last_rowid = watermarks.get("cache_rowid", 0)
+            for rowid, key, value, taxonomy_version in self._iter_rows(executor, self._cache_rows, last_rowid):
+                self._add_cache_row(columns, key, value, taxonomy_version)
+                last_rowid = rowid
+            watermarks["cache_rowid"] = last_rowid
+        elif source == "outputs":
+            data_dir = data_dir or os.getenv("DATA_DIR")
+            if not data_dir:
+                raise ValueError("DATA_DIR environment variable not set.")
+            since = watermarks.get("outputs_mtime", 0.0)
+            latest = since
+            # Only the newest changed output per key, so that a part never repeats a key
+            changed: Dict[str, Tuple[float, Path]] = {}
+            for output_path in Path(data_dir).rglob("*.json"):
+                mtime = output_path.stat().st_mtime
+                if mtime <= since:
+                    continue
+                latest = max(latest, mtime)
+                key = self._output_key(output_path, data_dir)
+                if key not in changed or mtime >= changed[key][0]:
+                    changed[key] = (mtime, output_path)
+            for key, (mtime, output_path) in sorted(changed.items(), key=lambda item: item[1]):
+                self._add_output_file(columns, key, output_path)
+            watermarks["outputs_mtime"] = latest
+        else:
+            raise ValueError(f"Unknown export source '{source}'; use 'cache' or 'outputs'.")
+
+        edges = {"document_id": [], "relationship_type": [], "target": []}
+        last_rowid = watermarks.get("relationships_rowid", 0)
+        for rowid, document_id, rel_type, target in self._iter_rows(executor, self._relationship_rows, last_rowid):
+            edges["document_id"].append(document_id)
+            edges["relationship_type"].append(self._code("relationship_type", rel_type))
+            edges["target"].append(target)
+            last_rowid = rowid
+        watermarks["relationships_rowid"] = last_rowid
+
+        classified = len(columns["key"])
+        if classified:
+            self._write_part("classifications", columns)
+        if edges["document_id"]:
+            self._write_part("edges", edges)
+        self._save_manifest()
+        return classified, len(edges["document_id"])
+
+    @staticmethod
+    def _empty_classification_columns() -> Dict[str, list]:
+        return {
+            "key": [], "source": [], "role": [], "collection": [], "model": [], "taxonomy_version": [],
+            "confidence": [], "refined_source": [], "tags": [], "tags_offsets": [0], "topics": [], "topics_offsets": [0],
+        }
+
+    @staticmethod
+    def _iter_rows(executor: StorageExecutor, query, after_rowid: int) -> Iterator[Tuple]:
+        """Page through a table by rowid so the export never holds a long read transaction"""
+        while True:
+            rows = executor.call(query, after_rowid)
+            if not rows:
+                return
+            yield from rows
+            after_rowid = rows[-1][0]
+
+    @staticmethod
+    def _cache_rows(conn: sqlite3.Connection, after_rowid: int) -> List[Tuple]:
+        return conn.execute(
+            "SELECT rowid, key, value, taxonomy_version FROM classification_cache WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (after_rowid, EXPORT_BATCH_SIZE)
+        ).fetchall()
+
+    @staticmethod
+    def _relationship_rows(conn: sqlite3.Connection, after_rowid: int) -> List[Tuple]:
+        return conn.execute(
+            "SELECT rowid, document_id, relationship_type, target FROM relationships WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (after_rowid, EXPORT_BATCH_SIZE)
+        ).fetchall()
+
+    def _add_cache_row(self, columns: Dict[str, list], key: str, value: str, taxonomy_version: Optional[str]) -> None:
+        match = _CACHE_KEY.match(key)
+        source, role = (match.group(1), match.group(3)) if match else ("", None)
+        self._add_row(columns, key, source, role, json.loads(value).get("classification", {}), taxonomy_version)
+
+    @staticmethod
+    def _output_key(output_path: Path, data_dir: str) -> str:
+        """Every re-run of a document and role shares the key, whatever its timestamp or result digest"""
+        return str(output_path.relative_to(data_dir).with_name(output_document_name(output_path.stem)))
+
+    def _add_output_file(self, columns: Dict[str, list], key: str, output_path: Path) -> None:
+        try:
+            data = json.loads(output_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable output {output_path}: {e}")
+            return
+        if not isinstance(data, dict) or "classification_results" not in data:
+            return
+        metadata = data.get("original_metadata", {})
+        role = metadata["role"] if "role" in metadata else self._output_role(Path(key).name)
+        self._add_row(columns, key, metadata.get("source_path", ""), role, data["classification_results"], None)
+
+    @staticmethod
+    def _output_role(name: str) -> Optional[str]:
+        """Role of an output saved before outputs recorded it, from the _<ROLE> part of its name"""
+        from models.openrouter_client import ROLE_FOCUS
+        parts = name.split("_")
+        for role in ROLE_FOCUS:
+            if role in parts[-2:]:
+                return role
+        return None
+
+    def _add_row(self, columns: Dict[str, list], key: str, source: str, role: Optional[str],
+                 classification: Dict, taxonomy_version: Optional[str]) -> None:
+        columns["key"].append(key)
+        columns["source"].append(source)
+        columns["role"].append(self._code("role", role or "default"))
+        columns["collection"].append(self._code("collection", classification.get("collection")))
+        columns["model"].append(self._code("model", classification.get("model_used")))
+        columns["taxonomy_version"].append(self._code("taxonomy_version", taxonomy_version))
+        try:
+            columns["confidence"].append(float(classification.get("confidence") or 0.0))
+        except (TypeError, ValueError):
+            columns["confidence"].append(0.0)
+        columns["refined_source"].append(classification.get("refined_source") or "")
+        for name, dictionary in (("tags", "tag"), ("topics", "topic")):
+            values = classification.get(name) or []
+            columns[name].extend(self._code(dictionary, str(v)) for v in values)
+            columns[f"{name}_offsets"].append(len(columns[name]))
+
+    def _write_part(self, table: str, columns: Dict[str, list]) -> None:
+        parts = self.manifest["parts"][table]
+        extension = "parquet" if self.backend == "parquet" else "npz"
+        relative = f"{table}/part-{len(parts):05d}.{extension}"
+        path = self.output_dir / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        if self.backend == "parquet":
+            pq.write_table(self._to_arrow(columns), tmp_path)
+        else:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **self._to_numpy(columns))
+        os.replace(tmp_path, path)
+        parts.append(relative)
+
+    @staticmethod
+    def _to_arrow(columns: Dict[str, list]):
+        arrays = {}
+        for name, values in columns.items():
+            if name.endswith("_offsets"):
+                continue
+            if name in LIST_COLUMNS:
+                arrays[name] = pa.ListArray.from_arrays(
+                    pa.array(columns[f"{name}_offsets"], pa.int32()), pa.array(values, pa.int32())
+                )
+            elif name == "confidence":
+                arrays[name] = pa.array(values, pa.float32())
+            elif name in _CODED_COLUMNS:
+                arrays[name] = pa.array(values, pa.int32())
+            else:
+                arrays[name] = pa.array(values, pa.string())
+        return pa.table(arrays)
+
+    @staticmethod
+    def _to_numpy(columns: Dict[str, list]) -> Dict:
+        arrays = {}
+        for name, values in columns.items():
+            if name.endswith("_offsets"):
+                arrays[name] = np.asarray(values, dtype=np.int64)
+            elif name == "confidence":
+                arrays[name] = np.asarray(values, dtype=np.float32)
+            elif name in _CODED_COLUMNS:
+                arrays[name] = np.asarray(values, dtype=np.int32)
+            else:
+                # Strings as concatenated UTF-8 plus offsets, so loading needs no pickling
+                encoded = [v.encode("utf-8") for v in values]
+                arrays[f"{name}_data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+                arrays[f"{name}_offsets"] = np.concatenate(([0], np.cumsum([len(b) for b in encoded], dtype=np.int64)))
+        return arrays
+
+def load_columnar(output_dir: str, table: str = "classifications"):
+    """
+    Load all parts of an exported table.
+
+    With the Parquet backend this returns a pyarrow Table whose coded columns are
+    dictionary arrays. With the numpy backend it returns a dict of arrays: int32
+    codes for coded columns (-1 for missing), <name>_offsets for list and string
+    columns, <name>_data (UTF-8 bytes) for string columns, and the manifest
+    dictionaries under "dictionaries".
+
+    Classification rows are deduplicated by key, keeping the row exported last.
+    """
+    manifest = json.loads((Path(output_dir) / "manifest.json").read_text(encoding="utf-8"))
+    dictionaries = manifest["dictionaries"]
+    paths = [Path(output_dir) / part for part in manifest["parts"][table]]
+    coded = DICTIONARY_COLUMNS[table]
+
+    if manifest["backend"] == "parquet":
+        if pa is None:
+            raise ImportError("Loading a Parquet export needs pyarrow.")
+        if not paths:
+            return pa.table({})
+        loaded = pa.concat_tables([pq.read_table(path) for path in paths])
+        # Each part holds a key once, so only keys repeated across parts need deduplicating
+        if len(paths) > 1 and "key" in loaded.column_names:
+            rows = _latest_rows_arrow(loaded.column("key"))
+            if rows is not None:
+                loaded = loaded.take(rows)
+        loaded = loaded.combine_chunks()
+        for name, dictionary in coded.items():
+            column = loaded.column(name).chunk(0) if loaded.column(name).num_chunks else pa.array([], pa.int32())
+            values = pa.array(dictionaries[dictionary], pa.string())
+            if name in LIST_COLUMNS:
+                codes = column.values
+                encoded = pa.ListArray.from_arrays(column.offsets, pa.DictionaryArray.from_arrays(codes, values))
+            else:
+                # -1 marks a missing value
+                encoded = pa.DictionaryArray.from_arrays(
+                    pc.if_else(pc.less(column, 0), pa.scalar(None, pa.int32()), column), values
+                )
+            loaded = loaded.set_column(loaded.schema.get_field_index(name), name, encoded)
+        return loaded
+
+    if np is None:
+        raise ImportError("Loading a numpy export needs numpy.")
+    parts = [np.load(path) for path in paths]
+    result: Dict = {"dictionaries": {name: dictionaries[dictionary] for name, dictionary in coded.items()}}
+    if not parts:
+        return result
+    for name in parts[0].files:
+        if name.endswith("_offsets"):
+            # Offsets restart at 0 in every part; shift them onto the concatenated data
+            base = name[:-len("_offsets")]
+            data_name = base if base in LIST_COLUMNS else f"{base}_data"
+            shifted, total = [], 0
+            for i, part in enumerate(parts):
+                offsets = part[name][1:] if i else part[name]
+                shifted.append(offsets + total)
+                total += len(part[data_name])
+            result[name] = np.concatenate(shifted)
+        else:
+            result[name] = np.concatenate([part[name] for part in parts])
+    if len(parts) > 1 and "key_data" in result:
+        rows = _latest_rows_numpy(result["key_data"], result["key_offsets"])
+        if rows is not None:
+            result = _take_rows(result, rows)
+    return result
+
+def _latest_rows_arrow(keys):
+    """Indices of the last row for each key in row order, or None if no key repeats"""
+    encoded = pc.dictionary_encode(keys).combine_chunks()
+    if len(encoded.dictionary) == len(encoded):
+        return None
+    if np is None:
+        rows = pa.table({"key": encoded.indices, "row": pa.array(range(len(encoded)), pa.int64())})
+        last = rows.group_by("key").aggregate([("row", "max")]).column("row_max")
+        return pc.take(last, pc.sort_indices(last))
+    return _latest_codes(encoded.indices.to_numpy())
+
+def _latest_rows_numpy(data, offsets):
+    """Indices of the last row for each key in row order, or None if no key repeats"""
+    lengths = np.diff(offsets)
+    width = max(int(lengths.max()) if len(lengths) else 0, 1)
+    # Keys as fixed-width byte strings (zero-padded), so that np.unique compares them in C
+    padded = np.zeros((len(lengths), width), dtype=np.uint8)
+    padded[np.arange(width) < lengths[:, None]] = data
+    return _latest_codes(padded.view(f"S{width}").ravel())
+
+def _latest_codes(codes):
+    """Indices of the last occurrence of each value in row order, or None if all values differ"""
+    # The first occurrence in reversed order is the last occurrence in row order
+    _, first_reversed = np.unique(codes[::-1], return_index=True)
+    if len(first_reversed) == len(codes):
+        return None
+    return np.sort(len(codes) - 1 - first_reversed)
+
+def _take_rows(columns: Dict, rows) -> Dict:
+    """Select rows (sorted row indices) from numpy-backend columns, including string and list columns stored with offsets"""
+    rows = np.asarray(rows, dtype=np.int64)
+    taken = {"dictionaries": columns["dictionaries"]}
+    keep = None
+    for name, values in columns.items():
+        if name == "dictionaries" or name.endswith("_offsets"):
+            continue
+        offsets_name = f"{name[:-len('_data')] if name.endswith('_data') else name}_offsets"
+        if offsets_name not in columns:
+            taken[name] = values[rows]
+            continue
+        offsets = columns[offsets_name]
+        if keep is None:
+            keep = np.zeros(len(offsets) - 1, dtype=bool)
+            keep[rows] = True
+        lengths = np.diff(offsets)
+        # Elements of kept rows, selected with a mask rather than per-element indices
+        taken[name] = values[np.repeat(keep, lengths)]
+        taken[offsets_name] = np.concatenate(([0], np.cumsum(lengths[rows]))).astype(np.int64)
+    return taken
+
+def decode_strings(data, offsets, indices=None) -> List[str]:
+    """Decode rows of a numpy-backend string column (all rows, or just the given indices)"""
+    raw = data.tobytes()
+    rows = range(len(offsets) - 1) if indices is None else indices
+    return [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in rows]
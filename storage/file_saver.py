@@ -1,19 +1,49 @@
 import os
+import re
 import json
+import hashlib
+import tempfile
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
+OUTPUT_MODES = ("timestamped", "content")
+# Suffix after the name stem: a digest of the source path and original filename, then a
+# timestamp (timestamped mode) or a result digest (content mode)
+_OUTPUT_SUFFIX = re.compile(r"_[0-9a-f]{8}(?=_(\d{8}_\d{6}|[0-9a-f]{16})$)")
+# Outputs written before source digests were added end in the timestamp or result digest only
+_LEGACY_OUTPUT_SUFFIX = re.compile(r"_(\d{8}_\d{6}|[0-9a-f]{16})$")
+
+def output_document_name(output_stem: str) -> str:
+    """Output file stem without its timestamp or result digest, the same for every output of a document and role"""
+    match = _OUTPUT_SUFFIX.search(output_stem)
+    if match:
+        return output_stem[:match.end()]
+    match = _LEGACY_OUTPUT_SUFFIX.search(output_stem)
+    return output_stem[:match.start()] if match else output_stem
+
 class FileSaver:
-    def __init__(self):
+    def __init__(self, mode: Optional[str] = None):
+        """
+        Args:
+            mode (Optional[str]): "timestamped" writes a new <stem>_<source>_<timestamp>.json per save;
+                                  "content" writes <stem>_<source>_<digest>.json, named by a digest of
+                                  the result, and skips the write if an identical output already exists.
+                                  <source> is a short digest of the source path and original filename.
+                                  Defaults to the OUTPUT_MODE environment variable.
+        """
         load_dotenv()
         self.data_dir = os.getenv("DATA_DIR")
         if not self.data_dir:
             raise ValueError("DATA_DIR environment variable not set.")
         self.base_path = Path(self.data_dir)
+        self.mode = mode or os.getenv("OUTPUT_MODE", "timestamped")
+        if self.mode not in OUTPUT_MODES:
+            raise ValueError(f"OUTPUT_MODE must be one of {', '.join(OUTPUT_MODES)}, got '{self.mode}'.")
 
-    def save_classified_document(self, original_document_data: Dict, classification_result: Dict, original_filename: str):
+    def save_classified_document(self, original_document_data: Dict, classification_result: Dict, original_filename: str,
+                                 role: Optional[str] = None):
         """
         Saves a classified document to the specified directory structure.
 
@@ -22,6 +52,8 @@ class FileSaver:
                                            which might be a parsed JSON object or raw content in a dict.
             classification_result (Dict): The classification results, including refined_source.
             original_filename (str): The original filename of the document.
+            role (Optional[str]): The classification role, added to the output filename so
+                                  that results for different roles do not overwrite each other.
         """
         # Use the 'source' from the original document data for directory creation
         source_for_directory = original_document_data.get("source", "unknown_source")
@@ -33,7 +65,6 @@ class FileSaver:
         target_directory = self.base_path / sanitized_source
         target_directory.mkdir(parents=True, exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         # Use original filename, but ensure it's valid and append .json
         safe_filename = "".join(c for c in original_filename if c.isalnum() or c in (' ', '.', '_', '-')).strip()
         if not safe_filename:
@@ -41,8 +72,10 @@ class FileSaver:
         
         # Remove existing extension and add .json
         safe_filename_stem = Path(safe_filename).stem
-        output_filename = f"{safe_filename_stem}_{timestamp}.json"
-        output_path = target_directory / output_filename
+        if role:
+            safe_filename_stem = f"{safe_filename_stem}_{''.join(c for c in role if c.isalnum() or c in ('_', '-'))}"
+        # Files sharing a stem (index.md, index.html) get distinct names, so compaction never mixes them up
+        safe_filename_stem = f"{safe_filename_stem}_{self._source_digest(source_for_directory, original_filename)}"
 
         # Determine the content to save for "original_document"
         # If original_document_data.get("original_document_content") is a dict (parsed JSON), save it as a dict.
@@ -57,6 +90,7 @@ class FileSaver:
             "original_metadata": {
                 "source_path": original_document_data.get("source", "N/A"),
                 "original_filename": original_filename,
+                "role": role,
                 "timestamp_processed": datetime.now().isoformat()
             },
             "classification_results": classification_result.get("classification", {}),
@@ -68,11 +102,121 @@ class FileSaver:
             }
         }
 
+        if self.mode == "content":
+            digest = self._result_digest(enhanced_data, role)
+            output_path = target_directory / f"{safe_filename_stem}_{digest}.json"
+            if output_path.exists():
+                # Same source and same result: the existing output is identical apart from timestamps.
+                # Touch it so compaction still treats it as the current output.
+                os.utime(output_path)
+                return
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_path = target_directory / f"{safe_filename_stem}_{timestamp}.json"
+
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(enhanced_data, f, indent=4)
+            self._write_atomic(output_path, enhanced_data)
             print(f"Successfully saved classified document to: {output_path}")
         except IOError as e:
             print(f"Error saving file {output_path}: {e}")
         except Exception as e:
             print(f"An unexpected error occurred while saving file {output_path}: {e}")
+
+    @staticmethod
+    def _source_digest(source: str, original_filename: str) -> str:
+        """Short digest of the source path and original filename, part of every output name"""
+        return hashlib.sha256(f"{source}\0{original_filename}".encode("utf-8")).hexdigest()[:8]
+
+    @staticmethod
+    def _result_digest(enhanced_data: Dict, role: Optional[str]) -> str:
+        """Digest of everything in an output except the fields that change on every run"""
+        stable = {
+            **enhanced_data,
+            "role": role,
+            "original_metadata": {k: v for k, v in enhanced_data["original_metadata"].items() if k != "timestamp_processed"},
+            "processing_metadata": {k: v for k, v in enhanced_data["processing_metadata"].items() if k != "processing_time_seconds"}
+        }
+        digest = hashlib.sha256()
+        # Hash the encoding chunk by chunk rather than building one string holding the whole document
+        for chunk in json.JSONEncoder(sort_keys=True, default=str).iterencode(stable):
+            digest.update(chunk.encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    @staticmethod
+    def _write_atomic(output_path: Path, data: Dict) -> None:
+        """Write to a temporary file in the target directory, then rename it into place"""
+        fd, tmp_path = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def compact(self, dry_run: bool = False) -> Tuple[int, int]:
+        """
+        Remove superseded outputs, keeping only the newest output per document and role.
+
+        Outputs are grouped by directory and name up to the source digest, which
+        identifies the original file and role in both output modes. Outputs from
+        before source digests were added to the names (<stem>[_ROLE]_<timestamp>.json)
+        join the group of the digest computed from the source path and original
+        filename recorded inside them; those without that metadata are left alone.
+
+        Args:
+            dry_run (bool): Only report what would be removed.
+
+        Returns:
+            Tuple[int, int]: Number of outputs kept and removed.
+        """
+        groups: Dict[Tuple[Path, str], list] = {}
+        for output_path in self.base_path.rglob("*.json"):
+            if not output_path.is_file():
+                continue
+            match = _OUTPUT_SUFFIX.search(output_path.stem)
+            name = output_path.stem[:match.end()] if match else self._legacy_output_name(output_path)
+            if name is not None:
+                groups.setdefault((output_path.parent, name), []).append(output_path)
+
+        kept = removed = 0
+        for paths in groups.values():
+            paths.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+            kept += 1
+            for superseded in paths[1:]:
+                if dry_run:
+                    print(f"Would remove {superseded}")
+                else:
+                    try:
+                        superseded.unlink()
+                    except OSError as e:
+                        print(f"Error removing {superseded}: {e}")
+                        continue
+                removed += 1
+        return kept, removed
+
+    def _legacy_output_name(self, output_path: Path) -> Optional[str]:
+        """Name up to the source digest that a legacy output would have been given, or None if unknown"""
+        match = _LEGACY_OUTPUT_SUFFIX.search(output_path.stem)
+        if not match:
+            return None
+        try:
+            with open(output_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f).get("original_metadata", {})
+        except (OSError, ValueError, AttributeError):
+            return None
+        source = metadata.get("source_path")
+        original_filename = metadata.get("original_filename")
+        if not isinstance(source, str) or not isinstance(original_filename, str):
+            return None
+        prefix = output_path.stem[:match.start()]
+        # Check that the name was derived from the recorded filename (the stem, possibly followed by a role)
+        stem = Path("".join(c for c in original_filename if c.isalnum() or c in (' ', '.', '_', '-')).strip() or "untitled").stem
+        if prefix != stem and not prefix.startswith(f"{stem}_"):
+            return None
+        if source == "N/A":
+            source = "unknown_source" # Written as N/A when the document had no source
+        return f"{prefix}_{self._source_digest(source, original_filename)}"
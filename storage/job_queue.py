@@ -0,0 +1,347 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+STATUSES = (PENDING, LEASED, DONE, FAILED)
+
+class QueueBackend(ABC):
+    """Storage interface for JobQueue.
+
+    Jobs are plain dicts with the keys id, document, role, status, attempts,
+    worker_id, lease_expires_at, last_error and resume_offset (the record to
+    continue from for JSON collections). Implementations must make
+    lease() atomic so that two workers never hold the same job.
+    """
+
+    @abstractmethod
+    def enqueue(self, items: Iterable[Tuple[str, Optional[str]]]) -> int:
+        """Add (document, role) pairs; existing pairs are left untouched. Returns the number added."""
+
+    @abstractmethod
+    def requeue(self, items: Iterable[Tuple[str, Optional[str]]], resume_offset: int = 0) -> int:
+        """Add (document, role) pairs, resetting existing ones to pending with no attempts, to run
+        from resume_offset. Returns the number affected."""
+
+    @abstractmethod
+    def lease(self, worker_id: str, lease_seconds: float, limit: int, max_attempts: int) -> List[Dict]:
+        """Atomically lease up to limit pending or expired jobs to worker_id"""
+
+    @abstractmethod
+    def heartbeat(self, worker_id: str, job_ids: List[int], lease_seconds: float) -> int:
+        """Extend the leases worker_id still holds. Returns the number extended."""
+
+    @abstractmethod
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        """Mark a leased job as done. Returns False if the lease was lost."""
+
+    @abstractmethod
+    def fail(self, job_id: int, worker_id: str, error: str, max_attempts: int,
+             resume_offset: Optional[int] = None) -> bool:
+        """Record a failure; the job is retried until max_attempts is reached, from resume_offset
+        if given. Returns False if the lease was lost."""
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+
+    @abstractmethod
+    def list_jobs(self, status: str, limit: int = 100) -> List[Dict]:
+        """Jobs with the given status"""
+
+class SQLiteQueueBackend(QueueBackend):
+    """QueueBackend on a SQLite database, shareable between processes on one host or a shared volume."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        db_path = db_path or os.getenv("JOB_QUEUE_DB", os.getenv("DATABASE_URL", "rag_classification.db"))
+        # Autocommit mode so that leasing can take the write lock with BEGIN IMMEDIATE;
+        # the connection is shared with the heartbeat thread, guarded by a lock
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        """Initialize database tables if they don't exist"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS job_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    document TEXT NOT NULL,
+                    role TEXT NOT NULL DEFAULT '',
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires_at REAL,
+                    last_error TEXT,
+                    updated_at REAL,
+                    resume_offset INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (document, role)
+                )
+            """)
+            # Queues created before resumable streams lack the resume_offset column
+            columns = [row[1] for row in cursor.execute("PRAGMA table_info(job_queue)")]
+            if "resume_offset" not in columns:
+                cursor.execute("ALTER TABLE job_queue ADD COLUMN resume_offset INTEGER NOT NULL DEFAULT 0")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_job_queue_status ON job_queue (status, lease_expires_at)"
+            )
+
+    def enqueue(self, items: Iterable[Tuple[str, Optional[str]]]) -> int:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.total_changes
+                cursor.executemany(
+                    """
+                    INSERT OR IGNORE INTO job_queue (document, role, status, updated_at)
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    ((document, role or "", PENDING, now) for document, role in items)
+                )
+                added = self.conn.total_changes - before
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return added
+
+    def requeue(self, items: Iterable[Tuple[str, Optional[str]]], resume_offset: int = 0) -> int:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.conn.total_changes
+                # A job currently leased keeps its lease; it is reset once it is done or failed
+                cursor.executemany(
+                    """
+                    INSERT INTO job_queue (document, role, status, updated_at, resume_offset)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(document, role) DO UPDATE SET
+                        status = excluded.status, attempts = 0, worker_id = NULL,
+                        lease_expires_at = NULL, last_error = NULL, resume_offset = excluded.resume_offset,
+                        updated_at = excluded.updated_at
+                    WHERE job_queue.status != ?
+                    """,
+                    ((document, role or "", PENDING, now, resume_offset, LEASED) for document, role in items)
+                )
+                affected = self.conn.total_changes - before
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return affected
+
+    def lease(self, worker_id: str, lease_seconds: float, limit: int, max_attempts: int) -> List[Dict]:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases belong to crashed or stalled workers: give up on jobs
+                # that have used all their attempts, the rest become leasable again
+                cursor.execute(
+                    """
+                    UPDATE job_queue
+                    SET status = ?, worker_id = NULL, lease_expires_at = NULL,
+                        last_error = COALESCE(last_error, 'lease expired'), updated_at = ?
+                    WHERE status = ? AND lease_expires_at < ? AND attempts >= ?
+                    """,
+                    (FAILED, now, LEASED, now, max_attempts)
+                )
+                cursor.execute(
+                    """
+                    SELECT id FROM job_queue
+                    WHERE status = ? OR (status = ? AND lease_expires_at < ?)
+                    ORDER BY id
+                    LIMIT ?
+                    """,
+                    (PENDING, LEASED, now, limit)
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                cursor.executemany(
+                    """
+                    UPDATE job_queue
+                    SET status = ?, worker_id = ?, lease_expires_at = ?,
+                        attempts = attempts + 1, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    ((LEASED, worker_id, now + lease_seconds, now, job_id) for job_id in ids)
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            return self._fetch("WHERE id IN (%s) ORDER BY id" % ",".join("?" * len(ids)), ids) if ids else []
+
+    def heartbeat(self, worker_id: str, job_ids: List[int], lease_seconds: float) -> int:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.executemany(
+                """
+                UPDATE job_queue SET lease_expires_at = ?, updated_at = ?
+                WHERE id = ? AND status = ? AND worker_id = ?
+                """,
+                ((now + lease_seconds, now, job_id, LEASED, worker_id) for job_id in job_ids)
+            )
+            return cursor.rowcount
+
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                UPDATE job_queue
+                SET status = ?, lease_expires_at = NULL, last_error = NULL, updated_at = ?
+                WHERE id = ? AND status = ? AND worker_id = ?
+                """,
+                (DONE, time.time(), job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str, max_attempts: int,
+             resume_offset: Optional[int] = None) -> bool:
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute(
+                """
+                UPDATE job_queue
+                SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                    worker_id = NULL, lease_expires_at = NULL, last_error = ?, updated_at = ?,
+                    resume_offset = COALESCE(?, resume_offset)
+                WHERE id = ? AND status = ? AND worker_id = ?
+                """,
+                (max_attempts, FAILED, PENDING, error, time.time(), resume_offset, job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("SELECT status, COUNT(*) FROM job_queue GROUP BY status")
+            counts = {status: 0 for status in STATUSES}
+            counts.update(dict(cursor.fetchall()))
+            # Leases past their expiry will be reclaimed by the next worker that asks for work
+            cursor.execute(
+                "SELECT COUNT(*) FROM job_queue WHERE status = ? AND lease_expires_at < ?",
+                (LEASED, time.time())
+            )
+            counts["expired_leases"] = cursor.fetchone()[0]
+            return counts
+
+    def list_jobs(self, status: str, limit: int = 100) -> List[Dict]:
+        with self.lock:
+            return self._fetch("WHERE status = ? ORDER BY id LIMIT ?", (status, limit))
+
+    def _fetch(self, where: str, params) -> List[Dict]:
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT id, document, role, status, attempts, worker_id, lease_expires_at, last_error, resume_offset "
+            f"FROM job_queue {where}",
+            params
+        )
+        return [
+            {
+                "id": row[0],
+                "document": row[1],
+                "role": row[2] or None,
+                "status": row[3],
+                "attempts": row[4],
+                "worker_id": row[5],
+                "lease_expires_at": row[6],
+                "last_error": row[7],
+                "resume_offset": row[8]
+            }
+            for row in cursor.fetchall()
+        ]
+
+    def __del__(self):
+        """Close database connection when instance is destroyed"""
+        if hasattr(self, 'conn'):
+            self.conn.close()
+
+class JobQueue:
+    """Durable work queue with leases for multi-process and multi-node batch runs.
+
+    Workers lease jobs for a limited time and extend the lease with heartbeats
+    while they work. Jobs whose lease runs out (because the worker crashed) are
+    handed to the next worker that asks, up to max_attempts times.
+    """
+
+    def __init__(self, backend: Optional[QueueBackend] = None):
+        self.backend = backend or SQLiteQueueBackend()
+        self.lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    def enqueue(self, documents: Iterable[str], role: Optional[str] = None) -> int:
+        """Enqueue document paths for classification with an optional role"""
+        return self.backend.enqueue((document, role) for document in documents)
+
+    def requeue(self, documents: Iterable[str], role: Optional[str] = None, resume_offset: int = 0) -> int:
+        """Enqueue documents for another run, even if they were already done or failed.
+
+        JSON collections are run from the record at resume_offset.
+        """
+        return self.backend.requeue(((document, role) for document in documents), resume_offset)
+
+    def lease(self, worker_id: str, limit: int = 1) -> List[Dict]:
+        """Lease up to limit jobs, reclaiming expired leases first"""
+        return self.backend.lease(worker_id, self.lease_seconds, limit, self.max_attempts)
+
+    def heartbeat(self, worker_id: str, job_ids: List[int]) -> int:
+        return self.backend.heartbeat(worker_id, job_ids, self.lease_seconds)
+
+    def complete(self, job: Dict, worker_id: str) -> bool:
+        return self.backend.complete(job["id"], worker_id)
+
+    def fail(self, job: Dict, worker_id: str, error: str, resume_offset: Optional[int] = None) -> bool:
+        """Record a failure; a JSON collection job retries from resume_offset if given"""
+        return self.backend.fail(job["id"], worker_id, error, self.max_attempts, resume_offset)
+
+    def status(self) -> Dict[str, int]:
+        return self.backend.counts()
+
+    def failed_jobs(self, limit: int = 100) -> List[Dict]:
+        return self.backend.list_jobs(FAILED, limit)
+
+    def keep_alive(self, worker_id: str, job_ids: List[int]) -> "LeaseHeartbeat":
+        """Context manager that heartbeats the given leases from a background thread"""
+        return LeaseHeartbeat(self, worker_id, job_ids)
+
+class LeaseHeartbeat:
+    """Extends leases periodically while a worker is busy with them."""
+
+    def __init__(self, queue: JobQueue, worker_id: str, job_ids: List[int]):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.job_ids = job_ids
+        self.interval = max(queue.lease_seconds / 3, 1.0)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.queue.heartbeat(self.worker_id, self.job_ids)
+            except sqlite3.Error as e:
+                print(f"Heartbeat failed for worker {self.worker_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
@@ -1,17 +1,17 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import sqlite3
 from datetime import datetime
-import os
+from storage.storage_executor import StorageExecutor
 
 class RelationshipStore:
-    def __init__(self):
-        db_path = os.getenv("DATABASE_URL", "rag_classification.db")
-        self.conn = sqlite3.connect(db_path)
-        self._init_db()
+    def __init__(self, executor: Optional[StorageExecutor] = None):
+        self.executor = executor or StorageExecutor.shared()
+        self.executor.call(self._init_db, write=True)
 
-    def _init_db(self):
+    @staticmethod
+    def _init_db(conn: sqlite3.Connection):
         """Initialize database tables if they don't exist"""
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS relationships (
                 document_id TEXT,
@@ -21,29 +21,28 @@ class RelationshipStore:
                 PRIMARY KEY (document_id, relationship_type, target)
             )
         """)
-        self.conn.commit()
 
-    def store(self, document_id: str, relationships: Dict[str, List[str]]) -> None:
-        """Store relationship metadata for a document"""
-        cursor = self.conn.cursor()
+    @staticmethod
+    def _store(conn: sqlite3.Connection, document_id: str, relationships: Dict[str, List[str]]) -> None:
+        cursor = conn.cursor()
         timestamp = datetime.utcnow()
         
         for rel_type, targets in relationships.items():
             for target in targets:
+                # An edge stored again keeps its row (and rowid), so incremental exports do not repeat it
                 cursor.execute(
                     """
-                    INSERT OR REPLACE INTO relationships 
+                    INSERT INTO relationships
                     (document_id, relationship_type, target, created_at)
                     VALUES (?, ?, ?, ?)
+                    ON CONFLICT (document_id, relationship_type, target) DO NOTHING
                     """,
                     (document_id, rel_type, target, timestamp)
                 )
-        
-        self.conn.commit()
 
-    def get_relationships(self, document_id: str) -> Dict[str, List[str]]:
-        """Get all relationships for a document"""
-        cursor = self.conn.cursor()
+    @staticmethod
+    def _get_relationships(conn: sqlite3.Connection, document_id: str) -> Dict[str, List[str]]:
+        cursor = conn.cursor()
         cursor.execute(
             "SELECT relationship_type, target FROM relationships WHERE document_id = ?",
             (document_id,)
@@ -57,8 +56,8 @@ class RelationshipStore:
             
         return results
 
-    def query_relationships(self, filters: Dict) -> List[Dict]:
-        """Query relationships by criteria"""
+    @staticmethod
+    def _query_relationships(conn: sqlite3.Connection, filters: Dict) -> List[Dict]:
         query = "SELECT document_id, relationship_type, target FROM relationships WHERE 1=1"
         params = []
         
@@ -74,7 +73,7 @@ class RelationshipStore:
             query += " AND target LIKE ?"
             params.append(f"%{filters['target']}%")
             
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
         cursor.execute(query, params)
         
         return [
@@ -84,4 +83,28 @@ class RelationshipStore:
                 "target": row[2]
             }
             for row in cursor.fetchall()
-        ]
\ No newline at end of file
+        ]
+
+    def store(self, document_id: str, relationships: Dict[str, List[str]]) -> None:
+        """Store relationship metadata for a document"""
+        self.executor.call(self._store, document_id, relationships, write=True)
+
+    def get_relationships(self, document_id: str) -> Dict[str, List[str]]:
+        """Get all relationships for a document"""
+        return self.executor.call(self._get_relationships, document_id)
+
+    def query_relationships(self, filters: Dict) -> List[Dict]:
+        """Query relationships by criteria"""
+        return self.executor.call(self._query_relationships, filters)
+
+    async def astore(self, document_id: str, relationships: Dict[str, List[str]]) -> None:
+        """Store relationship metadata without blocking the event loop; resolves once committed"""
+        await self.executor.run(self._store, document_id, relationships, write=True)
+
+    async def aget_relationships(self, document_id: str) -> Dict[str, List[str]]:
+        """Get all relationships for a document without blocking the event loop"""
+        return await self.executor.run(self._get_relationships, document_id)
+
+    async def aquery_relationships(self, filters: Dict) -> List[Dict]:
+        """Query relationships by criteria without blocking the event loop"""
+        return await self.executor.run(self._query_relationships, filters)
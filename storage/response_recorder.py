@@ -0,0 +1,109 @@
+from typing import Dict, Iterator, Optional
+import sqlite3
+import json
+from datetime import datetime
+from core.document import Document
+from storage.storage_executor import StorageExecutor
+
+REPLAY_BATCH_SIZE = 500
+
+class ResponseRecorder:
+    """Stores the raw LLM completion for each cache key so outputs can be re-derived offline.
+
+    A recording holds the completion text, the response metadata (model, id,
+    token usage, latency, routing tier, role) and the document it was produced
+    for. Replaying a recording re-runs parsing, relationship extraction and
+    saving without any network calls.
+    """
+
+    def __init__(self, executor: Optional[StorageExecutor] = None):
+        self.executor = executor or StorageExecutor.shared()
+        self.executor.call(self._init_db, write=True)
+
+    @staticmethod
+    def _init_db(conn: sqlite3.Connection):
+        """Initialize database tables if they don't exist"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                cache_key TEXT PRIMARY KEY,
+                raw_response TEXT,
+                model TEXT,
+                metadata TEXT,
+                document TEXT,
+                recorded_at TIMESTAMP
+            )
+        """)
+
+    @staticmethod
+    def _record(conn: sqlite3.Connection, cache_key: str, raw_response: str, model: str,
+                metadata: str, document: str) -> None:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO llm_responses
+            (cache_key, raw_response, model, metadata, document, recorded_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (cache_key, raw_response, model, metadata, document, datetime.utcnow())
+        )
+
+    @staticmethod
+    def _get(conn: sqlite3.Connection, cache_key: str) -> Optional[Dict]:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT cache_key, raw_response, model, metadata, document FROM llm_responses WHERE cache_key = ?",
+            (cache_key,)
+        )
+        row = cursor.fetchone()
+        return ResponseRecorder._to_recording(row) if row else None
+
+    @staticmethod
+    def _page(conn: sqlite3.Connection, after_key: str, limit: int) -> list:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT cache_key, raw_response, model, metadata, document FROM llm_responses "
+            "WHERE cache_key > ? ORDER BY cache_key LIMIT ?",
+            (after_key, limit)
+        )
+        return [ResponseRecorder._to_recording(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _to_recording(row) -> Dict:
+        return {
+            "cache_key": row[0],
+            "raw_response": row[1],
+            "model": row[2],
+            "metadata": json.loads(row[3] or "{}"),
+            "document": json.loads(row[4] or "{}")
+        }
+
+    async def arecord(self, cache_key: str, raw_response: Dict, document: Dict) -> None:
+        """Persist a raw completion (as attached by OpenRouterClient) for a cache key"""
+        metadata = {k: v for k, v in raw_response.items() if k != "content"}
+        await self.executor.run(
+            self._record,
+            cache_key,
+            raw_response.get("content", ""),
+            raw_response.get("model", ""),
+            json.dumps(metadata, default=str),
+            json.dumps(document.to_record() if isinstance(document, Document) else document, default=str),
+            write=True
+        )
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """Get the recording for a cache key"""
+        return self.executor.call(self._get, cache_key)
+
+    async def aget(self, cache_key: str) -> Optional[Dict]:
+        """Get the recording for a cache key without blocking the event loop"""
+        return await self.executor.run(self._get, cache_key)
+
+    def iter_recordings(self, batch_size: int = REPLAY_BATCH_SIZE) -> Iterator[Dict]:
+        """Iterate over all recordings in key order, a page at a time"""
+        after_key = ""
+        while True:
+            page = self.executor.call(self._page, after_key, batch_size)
+            if not page:
+                return
+            yield from page
+            after_key = page[-1]["cache_key"]
@@ -0,0 +1,146 @@
+import asyncio
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+class StorageExecutor:
+    """Owns the SQLite connection and runs every storage operation on one dedicated thread.
+
+    ClassificationCache and RelationshipStore share an executor per database, so
+    there is a single connection (no competition for the write lock between them)
+    and the event loop never blocks on SQLite. Writes are group-committed: the
+    thread drains all queued operations, runs them, and commits once for the batch
+    before resolving the write futures.
+    """
+
+    _shared: Dict[str, "StorageExecutor"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path: Optional[str] = None, max_batch: int = 256):
+        self.db_path = db_path or os.getenv("DATABASE_URL", "rag_classification.db")
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._ready = threading.Event()
+        self._closed = False
+        self._connect_error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, name="storage-executor", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._connect_error is not None:
+            # The storage thread could not open the database and has already exited
+            self._closed = True
+            raise self._connect_error
+
+    @classmethod
+    def shared(cls, db_path: Optional[str] = None) -> "StorageExecutor":
+        """Return the process-wide executor for a database, creating it on first use"""
+        db_path = db_path or os.getenv("DATABASE_URL", "rag_classification.db")
+        with cls._shared_lock:
+            executor = cls._shared.get(db_path)
+            if executor is None or executor._closed:
+                executor = cls(db_path)
+                cls._shared[db_path] = executor
+            return executor
+
+    def submit(self, fn: Callable[..., Any], *args, write: bool = False) -> Future:
+        """Queue fn(conn, *args) on the storage thread.
+
+        Write futures resolve only after the batch containing them is committed.
+        """
+        if self._closed:
+            raise RuntimeError("StorageExecutor is closed")
+        future: Future = Future()
+        self._queue.put((fn, args, write, future))
+        return future
+
+    def call(self, fn: Callable[..., Any], *args, write: bool = False) -> Any:
+        """Run fn(conn, *args) on the storage thread and wait for the result"""
+        return self.submit(fn, *args, write=write).result()
+
+    async def run(self, fn: Callable[..., Any], *args, write: bool = False) -> Any:
+        """Run fn(conn, *args) on the storage thread without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, write=write))
+
+    def close(self) -> None:
+        """Flush queued operations and stop the storage thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+        except Exception as e:
+            self._connect_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._run_batch(conn, batch)
+        finally:
+            conn.close()
+
+    def _run_batch(self, conn: sqlite3.Connection, batch) -> None:
+        outcomes = []
+        for fn, args, write, future in batch:
+            savepoint = False
+            try:
+                if write:
+                    # Each write runs in a savepoint of the shared transaction, so a
+                    # failing write is undone without affecting the rest of the batch
+                    if not conn.in_transaction:
+                        conn.execute("BEGIN")
+                    conn.execute("SAVEPOINT storage_write")
+                    savepoint = True
+                result = fn(conn, *args)
+                if savepoint:
+                    conn.execute("RELEASE storage_write")
+            except Exception as e:
+                if savepoint:
+                    conn.execute("ROLLBACK TO storage_write")
+                    conn.execute("RELEASE storage_write")
+                outcomes.append((future, write, None, e))
+            else:
+                outcomes.append((future, write, result, None))
+
+        commit_error = None
+        if conn.in_transaction:
+            try:
+                conn.commit()
+            except Exception as e:
+                commit_error = e
+                conn.rollback()
+
+        for future, write, result, error in outcomes:
+            if write and error is None:
+                error = commit_error
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+@atexit.register
+def _close_shared_executors() -> None:
+    for executor in list(StorageExecutor._shared.values()):
+        executor.close()
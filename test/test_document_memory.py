@@ -0,0 +1,90 @@
+import gc
+import json
+import tracemalloc
+
+import pytest
+
+from cli import load_file_document
+from core.document import Document, DocumentReleasedError
+from storage.file_saver import FileSaver
+
+CONTENT_CHARS = 2_000_000
+IN_FLIGHT = 8
+
+def _traced(fn):
+    """Run fn under tracemalloc and return (result, bytes still allocated, peak bytes)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current, peak
+
+@pytest.fixture
+def json_documents(tmp_path):
+    paths = []
+    for i in range(IN_FLIGHT):
+        path = tmp_path / f"doc_{i}.json"
+        path.write_text(json.dumps({"content": chr(ord("a") + i) * CONTENT_CHARS, "source": "docs", "id": i}))
+        paths.append(path)
+    return paths
+
+def test_in_flight_documents_hold_content_once(json_documents):
+    documents, current, peak = _traced(lambda: [load_file_document(str(path)) for path in json_documents])
+
+    # One content string per document; the original document shares it instead of copying it
+    assert current / IN_FLIGHT < CONTENT_CHARS * 1.2
+    # Loading one file briefly holds its text as well as the parsed content
+    assert peak / IN_FLIGHT < CONTENT_CHARS * 1.5
+    for document in documents:
+        assert document["original_document_content"]["content"] is document.content
+
+def test_reading_document_fields_does_not_copy_content():
+    document = Document.from_dict({"content": "x" * CONTENT_CHARS, "source": "docs", "filename": "doc.md"})
+
+    def read_fields():
+        return dict(document), document.original, document.to_record()
+
+    _, _, peak = _traced(read_fields)
+    assert peak < CONTENT_CHARS * 0.1
+
+def test_saving_document_does_not_serialize_whole_output(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_DIR", str(tmp_path / "outputs"))
+    saver = FileSaver(mode="content")
+    document = Document("x" * CONTENT_CHARS, "docs", "doc.md")
+    result = {"classification": {"collection": "docs", "confidence": 0.9}, "relationships": {}}
+
+    _, _, peak = _traced(lambda: saver.save_classified_document(document, result, document.filename))
+    # Each pass (digest, then the file) encodes the content string and then its UTF-8 bytes,
+    # one chunk at a time; the whole output is never built as one string
+    assert peak < CONTENT_CHARS * 2.5
+
+def test_release_frees_content(json_documents):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        documents = [load_file_document(str(path)) for path in json_documents]
+        loaded = tracemalloc.get_traced_memory()[0]
+        for document in documents:
+            document.release()
+        gc.collect()
+        released = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert loaded - released > IN_FLIGHT * CONTENT_CHARS * 0.9
+    assert all(document.released for document in documents)
+    with pytest.raises(DocumentReleasedError):
+        documents[0].content
+    # Everything but the content is still there for the output and re-runs
+    assert documents[0].original == {"source": "docs", "id": 0}
+
+def test_none_content_is_not_released():
+    document = Document(None, "docs", "empty.md")
+    assert not document.released
+    assert document.content is None
+    document.release()
+    with pytest.raises(DocumentReleasedError):
+        document.content
@@ -0,0 +1,275 @@
+import codecs
+import fnmatch
+import logging
+import os
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Directories that never hold documents worth classifying
+DEFAULT_EXCLUDE_DIRS = frozenset({
+    "node_modules", "__pycache__", ".git", ".hg", ".svn", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache"
+})
+BINARY_SNIFF_BYTES = 8192
+
+def _translate_ignore_pattern(pattern: str) -> str:
+    """Translate a .gitignore glob into a regex over '/'-separated relative paths"""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            regex += f"[{body}]"
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+class IgnoreRules:
+    """Rules from one .gitignore-style file, matched relative to the directory holding it.
+
+    Supports comments, negation (!), directory-only patterns (trailing /),
+    anchored patterns (leading or inner /) and ** wildcards. As in git, the
+    last matching rule decides.
+    """
+
+    def __init__(self, base_dir: str, lines: Iterable[str]):
+        self.base_dir = base_dir
+        self.rules: List[Tuple["re.Pattern", bool, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                self.rules.append((re.compile(_translate_ignore_pattern(line) + r"\Z"), negate, dir_only, anchored))
+
+    @classmethod
+    def from_file(cls, path: str) -> Optional["IgnoreRules"]:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(os.path.dirname(path), f)
+        except OSError:
+            return None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """Return True if ignored, False if explicitly re-included, None if no rule matches"""
+        relative = os.path.relpath(path, self.base_dir).replace(os.sep, "/")
+        name = relative.rsplit("/", 1)[-1]
+        decision = None
+        for regex, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relative if anchored else name):
+                decision = not negate
+        return decision
+
+def is_binary_file(path: str, sniff_bytes: int = BINARY_SNIFF_BYTES) -> bool:
+    """Guess whether a file is binary from its first bytes (NUL bytes or invalid UTF-8)"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(sniff_bytes)
+    except OSError:
+        return True
+    if b"\0" in head:
+        return True
+    try:
+        # Not final: a multi-byte character may be cut off at the end of the sample
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+def parse_size(value: str) -> int:
+    """Parse a size such as '500000', '512K', '10M' or '1G' into bytes"""
+    value = value.strip().upper()
+    multipliers = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+class FileScanner:
+    """Walks directory trees in parallel with os.scandir and yields matching files lazily.
+
+    Subdirectories are scanned on a thread pool, and paths are handed to the
+    caller through a bounded queue as soon as they are found, so classification
+    can start before the walk finishes.
+    """
+
+    def __init__(
+        self,
+        include: Optional[Sequence[str]] = None,
+        exclude: Optional[Sequence[str]] = None,
+        extensions: Optional[Iterable[str]] = None,
+        max_size: Optional[int] = None,
+        ignore_files: Sequence[str] = (".gitignore",),
+        exclude_dirs: Iterable[str] = DEFAULT_EXCLUDE_DIRS,
+        skip_hidden: bool = True,
+        skip_binary: bool = True,
+        workers: int = 8,
+        queue_size: int = 10000
+    ):
+        """
+        Args:
+            include: Glob patterns; if given, a file must match one (relative path or name).
+            exclude: Glob patterns for files and directories to skip (relative path or name).
+            extensions: Allowed file extensions such as ".md" (case-insensitive); None allows all.
+            max_size: Skip files larger than this many bytes.
+            ignore_files: Names of .gitignore-style files honoured in every scanned directory.
+            exclude_dirs: Directory names never descended into.
+            skip_hidden: Skip files and directories whose names start with a dot.
+            skip_binary: Skip files that look binary from their first bytes.
+            workers: Threads used to scan subtrees in parallel.
+            queue_size: Found paths buffered ahead of the consumer.
+        """
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.extensions = (
+            {ext.lower() if ext.startswith(".") else f".{ext.lower()}" for ext in extensions}
+            if extensions else None
+        )
+        self.max_size = max_size
+        self.ignore_files = list(ignore_files)
+        self.exclude_dirs = frozenset(exclude_dirs)
+        self.skip_hidden = skip_hidden
+        self.skip_binary = skip_binary
+        self.workers = workers
+        self.queue_size = queue_size
+
+    def scan(self, root: str, recursive: bool = True) -> Iterator[str]:
+        """Yield paths of files under root that pass all filters, in no particular order"""
+        root = os.path.abspath(root)
+        found: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        pending = [1]  # Directories queued or being scanned
+        lock = threading.Lock()
+        done = object()
+
+        def put(item) -> None:
+            # Give up if the consumer has stopped iterating, instead of blocking forever
+            while not stop.is_set():
+                try:
+                    found.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def scan_dir(path: str, rules: Tuple[IgnoreRules, ...]) -> None:
+            try:
+                if not stop.is_set():
+                    rules = rules + self._load_ignore_rules(path)
+                    for entry in self._scandir(path):
+                        if stop.is_set():
+                            break
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive and self._keep_dir(root, entry, rules):
+                                with lock:
+                                    pending[0] += 1
+                                pool.submit(scan_dir, entry.path, rules)
+                        elif entry.is_file() and self._keep_file(root, entry, rules):
+                            put(entry.path)
+            except Exception as e:
+                logging.error(f"Error scanning {path}: {e}")
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    finished = pending[0] == 0
+                if finished:
+                    put(done)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-scanner") as pool:
+            pool.submit(scan_dir, root, ())
+            try:
+                while True:
+                    item = found.get()
+                    if item is done:
+                        return
+                    yield item
+            finally:
+                stop.set()
+
+    @staticmethod
+    def _scandir(path: str) -> List[os.DirEntry]:
+        try:
+            with os.scandir(path) as entries:
+                return list(entries)
+        except OSError as e:
+            logging.warning(f"Cannot read directory {path}: {e}")
+            return []
+
+    def _load_ignore_rules(self, path: str) -> Tuple[IgnoreRules, ...]:
+        rules = []
+        for name in self.ignore_files:
+            ignore_path = os.path.join(path, name)
+            if os.path.isfile(ignore_path):
+                loaded = IgnoreRules.from_file(ignore_path)
+                if loaded and loaded.rules:
+                    rules.append(loaded)
+        return tuple(rules)
+
+    @staticmethod
+    def _ignored(path: str, is_dir: bool, rules: Tuple[IgnoreRules, ...]) -> bool:
+        # Deeper ignore files override shallower ones
+        for rule_set in reversed(rules):
+            decision = rule_set.match(path, is_dir)
+            if decision is not None:
+                return decision
+        return False
+
+    def _matches(self, patterns: List[str], relative: str, name: str) -> bool:
+        return any(fnmatch.fnmatch(relative, p) or fnmatch.fnmatch(name, p) for p in patterns)
+
+    def _keep_dir(self, root: str, entry: os.DirEntry, rules: Tuple[IgnoreRules, ...]) -> bool:
+        if entry.name in self.exclude_dirs or (self.skip_hidden and entry.name.startswith(".")):
+            return False
+        relative = os.path.relpath(entry.path, root).replace(os.sep, "/")
+        if self.exclude and self._matches(self.exclude, relative, entry.name):
+            return False
+        return not self._ignored(entry.path, True, rules)
+
+    def _keep_file(self, root: str, entry: os.DirEntry, rules: Tuple[IgnoreRules, ...]) -> bool:
+        name = entry.name
+        if self.skip_hidden and name.startswith("."):
+            return False
+        if self.extensions is not None and os.path.splitext(name)[1].lower() not in self.extensions:
+            return False
+        relative = os.path.relpath(entry.path, root).replace(os.sep, "/")
+        if self.include and not self._matches(self.include, relative, name):
+            return False
+        if self.exclude and self._matches(self.exclude, relative, name):
+            return False
+        if self._ignored(entry.path, False, rules):
+            return False
+        if self.max_size is not None:
+            try:
+                if entry.stat().st_size > self.max_size:
+                    return False
+            except OSError:
+                return False
+        if self.skip_binary and is_binary_file(entry.path):
+            return False
+        return True
@@ -1,7 +1,7 @@
 import re
 import os
 import json
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator, Tuple
 from datetime import datetime
 import logging
 
@@ -40,6 +40,21 @@ def preprocess_text(text: str) -> str:
     # Trim to first 10k characters to avoid excessive API costs
     return text[:10000]
 
+# Raw characters read for classification. preprocess_text keeps at most 10k
+# characters, but markup and code blocks are stripped first, so read generously.
+CLASSIFICATION_PREFIX_CHARS = int(os.getenv("CLASSIFICATION_PREFIX_CHARS", "200000"))
+
+def read_text_prefix(filepath: str, max_chars: int = CLASSIFICATION_PREFIX_CHARS) -> Tuple[str, bool]:
+    """Read at most max_chars characters from a text file.
+
+    Returns:
+        Tuple of (text, truncated) where truncated is True if the file is longer
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        text = f.read(max_chars)
+        truncated = bool(f.read(1))
+    return text, truncated
+
 def extract_code_blocks(text: str) -> List[str]:
     """Extract all code blocks from text"""
     return re.findall(r'```(?:[a-z]+\n)?(.*?)```', text, flags=re.DOTALL)
@@ -75,19 +90,258 @@ def validate_document(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         else:
             validated[field] = doc[field]
     
+    # Content must be text: null becomes empty, numbers are stringified, anything else is rejected
+    content = validated['content']
+    if content is None:
+        validated['content'] = ''
+    elif isinstance(content, (int, float)) and not isinstance(content, bool):
+        validated['content'] = str(content)
+    elif not isinstance(content, str):
+        logging.warning(f"Field 'content' must be a string, got {type(content).__name__}")
+        return None
+
     # Add metadata if missing
     validated['metadata'] = doc.get('metadata', {})
     return validated
 
+JSON_STREAM_CHUNK_SIZE = 1 << 16
+# Largest single record iter_json_records buffers before giving up, in characters
+MAX_JSON_RECORD_CHARS = int(os.getenv("MAX_JSON_RECORD_CHARS", str(64 * 1024 * 1024)))
+
+def _is_jsonl_path(filepath: str) -> bool:
+    return os.path.splitext(filepath)[1].lower() in ('.jsonl', '.ndjson')
+
+class JSONStreamError(json.JSONDecodeError):
+    """A JSON array whose structure is broken (a missing or doubled comma).
+
+    resume_offset is the first record after the error; iter_json_records started
+    from there (or later) only logs the error, so a resumed run gets past it.
+    """
+
+    def __init__(self, msg: str, resume_offset: int):
+        message = f"{msg}; resume from record {resume_offset}"
+        super().__init__(message, "", 0)
+        self.args = (message,) # Without the line and column, which mean nothing here
+        self.resume_offset = resume_offset
+
+def _iter_json_lines(filepath: str, start_offset: int, chunk_size: int,
+                     max_record_chars: int) -> Iterator[Tuple[int, Any]]:
+    """One record per non-blank line; bad lines are logged, skipped and still counted"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        offset = 0
+        while True:
+            line = f.readline(max_record_chars + 1)
+            if not line:
+                return
+            if len(line) > max_record_chars and not line.endswith('\n'):
+                # Drop the rest of an over-long line without holding it in memory
+                while line and not line.endswith('\n'):
+                    line = f.readline(chunk_size)
+                logging.warning(f"Skipping record {offset} in {filepath}: longer than {max_record_chars} characters")
+                offset += 1
+                continue
+            if not line.strip():
+                continue
+            if offset >= start_offset:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logging.warning(f"Skipping malformed record {offset} in {filepath}: {e}")
+                else:
+                    yield offset, item
+            offset += 1
+
+def iter_json_records(filepath: str, start_offset: int = 0, chunk_size: int = JSON_STREAM_CHUNK_SIZE,
+                      max_record_chars: int = MAX_JSON_RECORD_CHARS) -> Iterator[Tuple[int, Any]]:
+    """Incrementally parse a JSON array, JSONL file or single JSON value.
+
+    Reads the file in fixed-size chunks and decodes one record at a time, so
+    memory use depends on the largest record rather than the file size.
+
+    In .jsonl/.ndjson files each non-blank line is a record, and a line that does
+    not parse is logged and skipped but still counted. A top-level array is
+    expanded into its elements; a malformed element is skipped up to the next
+    comma the same way, while a missing or doubled comma raises JSONStreamError.
+    Anything else is treated as a sequence of whitespace-separated values.
+
+    Args:
+        filepath: Path to the JSON or JSONL file
+        start_offset: Number of leading records to skip (for resuming a run)
+        chunk_size: Number of characters read per chunk
+        max_record_chars: Skip (JSONL) or raise JSONDecodeError on (otherwise) a record longer
+            than this, so a malformed record does not pull the rest of the file into memory
+
+    Yields:
+        Tuples of (record offset, decoded record)
+    """
+    if _is_jsonl_path(filepath):
+        yield from _iter_json_lines(filepath, start_offset, chunk_size, max_record_chars)
+        return
+
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buf = ""
+        pos = 0
+        eof = False
+        in_array = None # Decided by the first character
+        # In an array: whether a value is expected next (after '[' or ','), and whether a ',' was just read
+        expect_value = True
+        after_comma = False
+        offset = 0
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            # Grow reads with the pending buffer so large records decode in amortized linear time
+            chunk = f.read(max(chunk_size, len(buf) - pos))
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_whitespace() -> bool:
+            """Advance past whitespace; return False once the input is exhausted"""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf):
+                    return True
+                if not fill():
+                    return False
+
+        def skip_element() -> None:
+            """Advance past a malformed array element, up to the next top-level ',' or ']'"""
+            nonlocal pos
+            depth = 0
+            in_string = escaped = False
+            length = 0
+            while True:
+                if pos + length >= len(buf):
+                    if length >= max_record_chars or not fill():
+                        raise json.JSONDecodeError(f"Record {offset} is malformed and could not be skipped", "", 0)
+                    continue
+                char = buf[pos + length]
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif char == '\\':
+                        escaped = True
+                    elif char == '"':
+                        in_string = False
+                elif char == '"':
+                    in_string = True
+                elif char in '[{':
+                    depth += 1
+                elif char in ']}':
+                    if depth == 0:
+                        break
+                    depth -= 1
+                elif char == ',' and depth == 0:
+                    break
+                length += 1
+            pos += length
+
+        def broken(msg: str, resume_offset: int) -> None:
+            """Raise for a broken array, or only log it while skipping records before start_offset"""
+            if resume_offset <= start_offset:
+                logging.warning(f"{msg} in {filepath}; continuing from record {resume_offset}")
+                return
+            raise JSONStreamError(msg, resume_offset)
+
+        while skip_whitespace():
+            if in_array is None:
+                in_array = buf[pos] == '['
+                if in_array:
+                    pos += 1
+                    continue
+            if in_array:
+                char = buf[pos]
+                if char == ']':
+                    if after_comma:
+                        broken(f"Trailing comma after record {offset - 1}", offset)
+                    return
+                if char == ',':
+                    pos += 1
+                    if expect_value:
+                        # A doubled comma: the empty slot counts as a record, so offsets stay put on resume
+                        broken(f"Missing record {offset} between commas", offset + 1)
+                        offset += 1
+                    expect_value = after_comma = True
+                    continue
+                if not expect_value:
+                    # Read on as if the comma were there
+                    broken(f"Missing comma before record {offset}", offset)
+                    expect_value = True
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if len(buf) - pos >= max_record_chars:
+                    raise json.JSONDecodeError(
+                        f"Record {offset} is malformed or longer than {max_record_chars} characters", buf[:0], 0
+                    )
+                # Only an error near the end of the buffer (a cut-off literal, number or escape) or an
+                # unfinished string may be fixed by more input
+                if (e.pos >= len(buf) - 16 or e.msg.startswith("Unterminated string")) and fill():
+                    continue
+                if not in_array:
+                    raise
+                skip_element()
+                expect_value = after_comma = False
+                if offset >= start_offset:
+                    logging.warning(f"Skipping malformed record {offset} in {filepath}: {e.msg}")
+                offset += 1
+                continue
+            # A value ending exactly at the buffer edge may be truncated (e.g. a number)
+            if end == len(buf) and fill():
+                continue
+            pos = end
+            expect_value = after_comma = False
+            if offset >= start_offset:
+                yield offset, item
+            offset += 1
+        if in_array:
+            raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+
+def iter_json_documents(filepath: str, start_offset: int = 0) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Stream validated documents from a JSON array or JSONL file.
+
+    Records that fail validation are logged and skipped; offsets still count
+    them so that a run can be resumed with the offset of the last record seen.
+    """
+    for offset, item in iter_json_records(filepath, start_offset):
+        validated = validate_document(item)
+        if validated is None:
+            logging.warning(f"Skipping invalid record {offset} in {filepath}")
+            continue
+        yield offset, validated
+
+def is_json_collection(filepath: str) -> bool:
+    """Check whether a file holds multiple JSON records (JSONL or a top-level array)"""
+    if _is_jsonl_path(filepath):
+        return True
+    # Only .json files are sniffed; Markdown and other text may also start with '['
+    if os.path.splitext(filepath)[1].lower() != '.json':
+        return False
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            while True:
+                chunk = f.read(1024)
+                if not chunk:
+                    return False
+                stripped = chunk.lstrip()
+                if stripped:
+                    return stripped[0] == '['
+    except (OSError, UnicodeDecodeError):
+        return False
+
 def process_json_file(filepath: str) -> List[Dict[str, Any]]:
     """Process a single JSON file"""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            items = json.load(f)
-            if isinstance(items, list):
-                return items
-            else:
-                return [items]
+        return [item for _, item in iter_json_records(filepath)]
     except Exception as e:
         logging.error(f"Error loading {filepath}: {str(e)}")
         return []